@@ -0,0 +1,1721 @@
+"""
+YAAP benchmark suite
+
+Runs YAAP's hot paths against local stand-ins so results are
+reproducible without network access or the real binaries:
+
+- fake yt-dlp, mpv (JSON IPC on the socket), cava (raw frames) and jp2a
+  executables on a temporary PATH
+- a local HTTP server standing in for lrclib.net and i.ytimg.com
+
+Usage:
+    python bench.py --output bench.json
+    python bench.py --output new.json --compare bench.json
+"""
+
+import argparse
+import curses
+import http.server
+import json
+import os
+import platform
+import pty
+import resource
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+FAKE_YTDLP = r'''
+import json, os, sys, time, zlib
+
+args = sys.argv[1:]
+if "--version" in args:
+    print("2099.01.01 (yaap bench)")
+    sys.exit(0)
+
+base = os.environ.get("YAAP_BENCH_HTTP", "http://127.0.0.1:9")
+time.sleep(float(os.environ.get("YAAP_FAKE_YTDLP_DELAY", "0.05")))
+target = args[-1]
+if "--dump-json" not in args:
+    time.sleep(float(os.environ.get("YAAP_FAKE_SEARCH_DELAY", "0")))
+
+if "--dump-json" in args:
+    vid = target.rsplit("v=", 1)[-1]
+    expire = int(time.time()) + 21600
+    sig = zlib.crc32(f"{vid}:{expire}".encode())
+    print(json.dumps({
+        "id": vid,
+        "url": f"{base}/media/{vid}?expire={expire}&sig={sig}",
+        "http_headers": {"User-Agent": "yaap-bench"},
+    }))
+    sys.exit(0)
+
+seed = zlib.crc32(target.encode())
+entries = []
+for i in range(10):
+    vid = f"b{(seed + i) % 10**9:09d}x"
+    entries.append({
+        "id": vid,
+        "title": f"Bench Artist {i} - Bench Track {seed % 997} (Official Video)",
+        "duration": 180 + i * 7,
+        "uploader": f"Bench Artist {i}",
+        "url": f"https://youtube.com/watch?v={vid}",
+        "thumbnail": f"{base}/vi/{vid}/default.jpg",
+    })
+
+if "--get-id" in args:
+    for e in entries:
+        print(e["title"])
+        print(f"{e['duration'] // 60}:{e['duration'] % 60:02d}")
+        print(e["id"])
+else:
+    print(json.dumps({"entries": entries}))
+'''
+
+FAKE_MPV = r'''
+import json, os, re, signal, socket, sys, threading, time
+
+args = sys.argv[1:]
+if "--version" in args:
+    print("mpv 0.99.0 (yaap bench)")
+    sys.exit(0)
+
+opts = {}
+for a in args:
+    if a.startswith("--") and "=" in a:
+        key, value = a[2:].split("=", 1)
+        opts[key] = value
+
+path = opts.get("input-ipc-server")
+startup = float(os.environ.get("YAAP_FAKE_MPV_STARTUP", "0.2"))
+duration = float(os.environ.get("YAAP_FAKE_MPV_DURATION", "240"))
+rate = float(os.environ.get("YAAP_FAKE_MPV_RATE", "250000"))
+
+# Bitrate follows the requested format; startup waits for two seconds of
+# media, then the cache fills at `rate` until it is `readahead` ahead
+fmt = opts.get("ytdl-format", "bestaudio/best")
+abr = re.search(r"abr<=(\d+)", fmt)
+height = re.search(r"height<=(\d+)", fmt)
+if "--no-video" in args:
+    bitrate = int(abr.group(1)) * 1000 if abr else 256000
+else:
+    bitrate = {360: 700000, 720: 2500000}.get(
+        int(height.group(1)) if height else 0, 5000000
+    )
+readahead = float(opts.get("demuxer-readahead-secs", 20))
+spawned = time.monotonic()
+startup += bitrate / 8 * 2 / rate
+state = {"base": float(opts.get("start", 0) or 0),
+         "t0": time.monotonic() + startup}
+lock = threading.Lock()
+
+
+def position():
+    now = time.monotonic()
+    with lock:
+        if now < state["t0"]:
+            return None
+        return min(duration, state["base"] + now - state["t0"])
+
+
+def cache_speed(pos):
+    needed = bitrate / 8 * ((pos or 0) + readahead)
+    if rate * (time.monotonic() - spawned) < needed:
+        return rate
+    return bitrate / 8
+
+
+def properties(name):
+    pos = position()
+    if name == "time-pos":
+        return pos
+    if name == "cache-speed":
+        return cache_speed(pos)
+    if pos is None:
+        return None
+    return {
+        "duration": duration,
+        "audio-codec-name": "opus",
+        "audio-bitrate": bitrate,
+        "demuxer-cache-time": min(duration, pos + 20),
+        "pause": False,
+    }.get(name)
+
+
+def handle(conn):
+    buf = b""
+    while True:
+        try:
+            chunk = conn.recv(4096)
+        except OSError:
+            return
+        if not chunk:
+            return
+        buf += chunk
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            try:
+                req = json.loads(line)
+            except ValueError:
+                continue
+            cmd = req.get("command", [])
+            reply = {"error": "success", "data": None,
+                     "request_id": req.get("request_id", 0)}
+            events = []
+            if cmd and cmd[0] == "get_property":
+                value = properties(cmd[1])
+                if value is None:
+                    reply["error"] = "property unavailable"
+                reply["data"] = value
+            elif cmd and cmd[0] == "seek":
+                target = float(cmd[1])
+                mode = cmd[2] if len(cmd) > 2 else "relative"
+                cur = position() or 0.0
+                with lock:
+                    if mode.startswith("absolute-percent"):
+                        state["base"] = duration * target / 100
+                    elif mode.startswith("absolute"):
+                        state["base"] = target
+                    else:
+                        state["base"] = cur + target
+                    state["base"] = max(0.0, min(duration, state["base"]))
+                    state["t0"] = time.monotonic()
+                events = [{"event": "seek"}, {"event": "playback-restart"}]
+            elif cmd and cmd[0] == "quit":
+                os._exit(0)
+            out = json.dumps(reply).encode() + b"\n"
+            for event in events:
+                out += json.dumps(event).encode() + b"\n"
+            try:
+                conn.sendall(out)
+            except OSError:
+                return
+
+
+def serve():
+    if os.path.exists(path):
+        os.remove(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(16)
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+if path:
+    threading.Thread(target=serve, daemon=True).start()
+time.sleep(startup + duration)
+'''
+
+FAKE_CAVA = r'''
+import math, os, sys, time
+
+if "--version" in sys.argv:
+    print("cava 0.10.0 (yaap bench)")
+    sys.exit(0)
+
+fps = float(os.environ.get("YAAP_FAKE_CAVA_FPS", "60"))
+i = 0
+try:
+    while True:
+        vals = [int(500 + 499 * math.sin(i / 5 + b / 3)) for b in range(40)]
+        sys.stdout.write(";".join(map(str, vals)) + ";\n")
+        sys.stdout.flush()
+        i += 1
+        time.sleep(1 / fps)
+except (BrokenPipeError, KeyboardInterrupt):
+    pass
+'''
+
+FAKE_JP2A = r'''
+import sys
+
+if "--version" in sys.argv:
+    print("jp2a 1.1.1 (yaap bench)")
+    sys.exit(0)
+for row in range(20):
+    print("".join(" .:-=+*#%@"[(row + col) % 10] for col in range(40)))
+'''
+
+
+def lrc_payload(track: str, artist: str, duration: float) -> Dict:
+    """Payload shaped like an lrclib track record"""
+    synced = "\n".join(
+        f"[{i * 4 // 60:02d}:{i * 4 % 60:02d}.{i * 7 % 100:02d}] line {i} of {track}"
+        for i in range(48)
+    )
+    return {
+        "id": 1234,
+        "trackName": track,
+        "artistName": artist,
+        "albumName": "Bench Album",
+        "duration": duration,
+        "instrumental": False,
+        "plainLyrics": "\n".join(f"line {i} of {track}" for i in range(48)),
+        "syncedLyrics": synced,
+    }
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """lrclib.net + i.ytimg.com + media CDN stand-in"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    thumbnail = bytes(range(256)) * 16
+    media = bytes(256 * 1024)
+    hits: Dict[str, int] = {}
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, ctype: str, extra=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        route = parsed.path.split("/")[1] if "/" in parsed.path else ""
+        StubHandler.hits[route] = StubHandler.hits.get(route, 0) + 1
+
+        if parsed.path.startswith("/vi/"):
+            etag = '"thumb-v1"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_body(304, b"", "image/jpeg", {"ETag": etag})
+            else:
+                self.send_body(200, self.thumbnail, "image/jpeg", {"ETag": etag})
+        elif parsed.path == "/api/search":
+            # Recorded shape: several versions of a track, different lengths
+            query = params.get("q") or params.get("track_name", "")
+            artist = params.get("artist_name", "Bench Artist")
+            body = [
+                lrc_payload(query, artist, 150.0),
+                lrc_payload(query, artist, 203.0),
+                lrc_payload(query, artist, 260.0),
+            ]
+            body[0]["syncedLyrics"] = None
+            self.send_body(200, json.dumps(body).encode(), "application/json")
+        elif parsed.path == "/api/get":
+            track = params.get("track_name", "")
+            if "nomatch" in track.lower():
+                body = {"code": 404, "name": "TrackNotFound"}
+                self.send_body(404, json.dumps(body).encode(), "application/json")
+                return
+            body = lrc_payload(
+                track,
+                params.get("artist_name", ""),
+                float(params.get("duration", 200) or 200),
+            )
+            self.send_body(200, json.dumps(body).encode(), "application/json")
+        elif parsed.path.startswith("/media/"):
+            # Like googlevideo: expired or tampered URLs are refused
+            vid = parsed.path.rsplit("/", 1)[-1]
+            expire = params.get("expire", "0")
+            sig = str(zlib.crc32(f"{vid}:{expire}".encode()))
+            if not expire.isdigit() or int(expire) < time.time() or (
+                "sig" in params and params["sig"] != sig
+            ):
+                self.send_body(403, b"forbidden", "text/plain")
+                return
+            data = self.media
+            rng = self.headers.get("Range", "")
+            if rng.startswith("bytes="):
+                start, _, end = rng[6:].partition("-")
+                start = int(start or 0)
+                end = int(end) if end else len(data) - 1
+                part = data[start : end + 1]
+                self.send_body(
+                    206,
+                    part,
+                    "audio/webm",
+                    {"Content-Range": f"bytes {start}-{end}/{len(data)}"},
+                )
+            else:
+                self.send_body(200, data, "audio/webm")
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+
+def install_fakes(bin_dir: str):
+    for name, source in (
+        ("yt-dlp", FAKE_YTDLP),
+        ("mpv", FAKE_MPV),
+        ("cava", FAKE_CAVA),
+        ("jp2a", FAKE_JP2A),
+    ):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\n{source}")
+        os.chmod(path, 0o755)
+
+
+def stats_ms(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(
+            ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3
+        ),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "n": len(ordered),
+    }
+
+
+def make_tui(yaap, stdscr=None, **overrides):
+    args = yaap.build_arg_parser().parse_args([])
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return yaap.YouTubeTUI(stdscr, args)
+
+
+def sample_results(count: int = 10) -> List[Dict]:
+    return [
+        {
+            "title": f"Bench Artist {i} - Bench Track {i} (Official Video)",
+            "id": f"sample{i:05d}",
+            "url": f"https://youtube.com/watch?v=sample{i:05d}",
+            "duration": "3:25",
+            "channel": f"Bench Artist {i}",
+            "thumbnail": "",
+        }
+        for i in range(count)
+    ]
+
+
+def fill_render_state(tui):
+    """Put the TUI in a busy 'playing' state without spawning anything"""
+    tui.results = sample_results()
+    for video in tui.results:
+        tui.thumbnails[video["id"]] = [
+            "".join(" .:-=+*#%@"[(r + c) % 10] for c in range(40))
+            for r in range(20)
+        ]
+    tui.current_video = tui.results[0]
+    tui.search_query = "bench query"
+    tui.playing = True
+    tui.playback_time = 42.0
+    tui.playback_duration = 205.0
+    tui.cava_output = ["▁▂▃▄▅▆▇█" * 5]
+    tui.lyrics = [f"lyric line {i} with a few more words" for i in range(80)]
+    tui.synced_lyrics = [(i * 4.0, line) for i, line in enumerate(tui.lyrics)]
+    tui.current_lyric_line = 10
+
+
+def render_child(stdscr, yaap, out_path: str, frames: int):
+    tui = make_tui(yaap, stdscr)
+    fill_render_state(tui)
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        tui.draw_frame()
+        times.append(time.perf_counter() - start)
+    with open(out_path, "w") as f:
+        json.dump(times, f)
+
+
+def scenario_render_curses(yaap, frames: int) -> Dict:
+    """Frame time through real curses on a pseudo-terminal"""
+    out_path = tempfile.mktemp(prefix="yaap_render_")
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.environ.update(TERM="xterm-256color", LINES="50", COLUMNS="160")
+        try:
+            curses.wrapper(render_child, yaap, out_path, frames)
+        finally:
+            os._exit(0)
+
+    while True:
+        try:
+            if not os.read(fd, 65536):
+                break
+        except OSError:
+            break
+    os.waitpid(pid, 0)
+    os.close(fd)
+    try:
+        with open(out_path) as f:
+            times = json.load(f)
+        os.remove(out_path)
+    except Exception:
+        return {"error": "render child failed"}
+    return {"frame": stats_ms(times), "terminal": "160x50"}
+
+
+def scenario_render_headless(yaap, frames: int) -> Dict:
+    """Pure draw-pipeline cost on the in-memory screen"""
+    screen = yaap.MemoryScreen(50, 160)
+    tui = make_tui(yaap, screen)
+    fill_render_state(tui)
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        tui.draw_frame()
+        times.append(time.perf_counter() - start)
+    return {
+        "frame": stats_ms(times),
+        "addstr_calls_per_frame": round(screen.addstr_calls / frames, 1),
+        "addstr_bytes_per_frame": round(screen.addstr_bytes / frames, 1),
+        "emitted_bytes_per_frame": round(screen.emitted_bytes / frames, 1),
+    }
+
+
+def scenario_layout(yaap, frames: int) -> Dict:
+    """Draw CJK / emoji titles and lyrics headless; nothing may spill
+    past a column edge and repeated strings should come from the cache"""
+    screen = yaap.MemoryScreen(50, 160)
+    tui = make_tui(yaap, screen)
+    fill_render_state(tui)
+    for i, video in enumerate(tui.results):
+        video["title"] = f"米津玄師 {i} - 感電 🎸🔥 (Official Music Video) 『ライブ』 " * 2
+        video["channel"] = f"米津玄師 Kenshi Yonezu チャンネル {i}"
+    tui.current_video = tui.results[0]
+    tui.lyrics = [f"夜明けの歌 {i} 🌅 光の中で踊る 君と僕の物語" * 2 for i in range(80)]
+    tui.synced_lyrics = [(i * 4.0, line) for i, line in enumerate(tui.lyrics)]
+    times = []
+    for frame in range(frames):
+        if frame == frames // 2:
+            tui.handle_input(curses.KEY_RESIZE)
+        tui.playback_time = 42.0 + frame
+        tui.current_lyric_line = 10 + frame % 60
+        start = time.perf_counter()
+        tui.draw_frame()
+        times.append(time.perf_counter() - start)
+    layout = tui.layout
+    lookups = layout.hits + layout.misses
+    return {
+        "frame": stats_ms(times),
+        "wraps": screen.wraps,
+        "cache_entries": len(layout.entries),
+        "cache_hit_rate": round(layout.hits / lookups, 3) if lookups else None,
+        "passed": screen.wraps == 0,
+    }
+
+
+def scenario_profiler(yaap, workdir: str, frames: int, rate: float = 100) -> Dict:
+    """Draw-loop slowdown while --profile samples at `rate` Hz"""
+    screen = yaap.MemoryScreen(50, 160)
+    tui = make_tui(yaap, screen)
+    fill_render_state(tui)
+
+    def measure() -> float:
+        start = time.perf_counter()
+        for _ in range(frames):
+            tui.draw_frame()
+        return time.perf_counter() - start
+
+    # A playing session has this many workers parked (mpv monitor, cava,
+    # lyrics animator, warmer, ...); each is walked on every sample
+    parked = threading.Event()
+    for i in range(8):
+        threading.Thread(target=parked.wait, name=f"parked-{i}", daemon=True).start()
+    measure()
+    profiler = yaap.SamplingProfiler(rate)
+    baseline, profiled, shares = [], [], []
+    for _ in range(5):
+        baseline.append(measure())
+        profiler.stop_event.clear()
+        cpu_before = profiler.cpu_seconds
+        profiler.start()
+        profiled.append(measure())
+        profiler.stop()
+        shares.append((profiler.cpu_seconds - cpu_before) / profiled[-1])
+    # The sampler's own CPU time is what it takes from the app; wall-clock
+    # slowdown is reported too but is too noisy to gate on a shared box
+    cpu_pct = sorted(shares)[len(shares) // 2] * 100
+    parked.set()
+    baseline, profiled = min(baseline), min(profiled)
+
+    start = time.perf_counter()
+    profiler.write(os.path.join(workdir, "profile"))
+    write_s = time.perf_counter() - start
+    folded = {
+        name: yaap.THREAD_ID.sub("", name)
+        for name in (
+            "lyrics-animator-12",
+            "mpv-monitor-123",
+            "cava-reader-1234",
+            "thumbnail-dQw4w9WgXcQ",
+            "thumbnail-remote",
+        )
+    }
+    names_ok = folded == {
+        "lyrics-animator-12": "lyrics-animator",
+        "mpv-monitor-123": "mpv-monitor",
+        "cava-reader-1234": "cava-reader",
+        "thumbnail-dQw4w9WgXcQ": "thumbnail",
+        "thumbnail-remote": "thumbnail-remote",
+    }
+    return {
+        "rate_hz": rate,
+        "samples": profiler.samples,
+        "thread_names_folded": names_ok,
+        "sampler_cpu_pct": round(cpu_pct, 2),
+        "passed": names_ok and cpu_pct < 1.0,
+        "overhead_pct": round((profiled / baseline - 1) * 100, 1),
+        "write_ms": round(write_s * 1000, 2),
+    }
+
+
+def scenario_index(yaap, tracks: int, updates: int) -> Dict:
+    """Re-upserting results whose channel changed (every search does) on a
+    large index, and a type-ahead query racing those updates"""
+    index = yaap.SearchIndex()
+    index.add_results(
+        [
+            {"id": f"idx{i:06d}", "title": f"Song s{i:06d}", "channel": "Uploader"}
+            for i in range(tracks)
+        ]
+    )
+    update, suggest = [], []
+    for n in range(updates):
+        batch = [
+            {
+                "id": f"idx{(n * 30 + i) % tracks:06d}",
+                "title": f"Song s{(n * 30 + i) % tracks:06d}",
+                "channel": f"Channel {n}",
+            }
+            for i in range(30)
+        ]
+        writer = threading.Thread(target=index.add_results, args=(batch,))
+        start = time.perf_counter()
+        writer.start()
+        query_start = time.perf_counter()
+        index.search(f"s{n * 7919 % tracks:06d}")
+        suggest.append(time.perf_counter() - query_start)
+        writer.join()
+        update.append(time.perf_counter() - start)
+    update_stats, suggest_stats = stats_ms(update), stats_ms(suggest)
+    return {
+        "tracks": tracks,
+        "update_30": update_stats,
+        "suggest_during_update": suggest_stats,
+        "passed": update_stats["p95_ms"] < 10 and suggest_stats["p95_ms"] < 10,
+    }
+
+
+def scenario_search(yaap, tui, runs: int) -> Dict:
+    hedged, fanout = [], []
+    for i in range(runs):
+        start = time.perf_counter()
+        tui.hedged_search.run(f"bench query {i}")
+        hedged.append(time.perf_counter() - start)
+
+        first = []
+        start = time.perf_counter()
+        tui.fanout.run(
+            f"bench query {i}",
+            lambda merged, name: first or first.append(time.perf_counter()),
+        )
+        if first:
+            fanout.append(first[0] - start)
+
+    # A primary that always loses to the hedge must still be recorded, or
+    # the delay only ever sees its fast runs and ratchets down
+    slow = yaap.HedgedSearch(
+        yaap.SearchStrategy(
+            "slow", lambda q: ["sh", "-c", "sleep 1; echo slow"], str.split, 5
+        ),
+        yaap.SearchStrategy("fast", lambda q: ["echo", "fast"], str.split, 5),
+        initial_delay=0.2,
+        min_delay=0.05,
+    )
+    for i in range(6):
+        slow.run(f"bench query {i}")
+    delay = slow.hedge_delay()
+    recorded = len(slow.latencies.get("slow", [])) == 6
+    # Nearest-rank p90 of five samples is the largest, not the fourth
+    slow.latencies["slow"] = [0.5, 0.1, 0.4, 0.2, 0.3]
+    p90_ok = slow.hedge_delay() == 0.5
+    return {
+        "hedged": stats_ms(hedged),
+        "fanout_first_results": stats_ms(fanout),
+        "losing_primary_recorded": recorded,
+        "hedge_delay_after_losses_s": round(delay, 3),
+        "hedge_delay_p90_ok": p90_ok,
+        "passed": recorded and delay >= 0.2 and p90_ok,
+    }
+
+
+def scenario_thumbnails(yaap, tui, count: int, base: str) -> Dict:
+    tui.thumbnails.clear()
+    videos = [
+        {"id": f"thumb{i:05d}", "thumbnail": f"{base}/vi/thumb{i:05d}/default.jpg"}
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=tui.download_thumbnail, args=(v["id"], v["thumbnail"])
+        )
+        for v in videos
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "count": count,
+        "total_ms": round(elapsed * 1000, 3),
+        "per_second": round(count / elapsed, 2),
+    }
+
+
+def wait_first_audio(tui, timeout: float = 10.0) -> Optional[float]:
+    samples = tui.tracer.samples.get("mpv.first-time-pos")
+    seen = len(samples) if samples else 0
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        samples = tui.tracer.samples.get("mpv.first-time-pos")
+        if samples and len(samples) > seen:
+            return samples[-1]
+        time.sleep(0.005)
+    return None
+
+
+def scenario_lyrics(yaap, tui, runs: int) -> Dict:
+    """Exact-match hits vs ranked-search fallbacks against the lrclib stub"""
+    exact, fallback = [], []
+    picked = []
+    before = dict(StubHandler.hits)
+    for i in range(runs):
+        start = time.perf_counter()
+        tui.lookup_lyrics(
+            f"Bench Artist {i} - Exact Song {i} (Official Video) [HD]",
+            "Bench Artist VEVO",
+            205.0,
+        )
+        exact.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        record = tui.lookup_lyrics(f"Bench Artist {i} - Nomatch Song {i}", "", 205.0)
+        fallback.append(time.perf_counter() - start)
+        picked.append(record and record.get("duration"))
+    requests = {
+        k: v - before.get(k, 0) for k, v in StubHandler.hits.items() if k == "api"
+    }
+    return {
+        "exact": stats_ms(exact),
+        "fallback": stats_ms(fallback),
+        "requests": requests.get("api", 0),
+        "closest_duration_picked": all(d == 203.0 for d in picked),
+        "passed": all(d == 203.0 for d in picked),
+    }
+
+
+def scenario_lyrics_import(yaap, tui, workdir: str, files: int) -> Dict:
+    """Bulk .lrc import, incremental re-import and offline-first lookups"""
+    root = os.path.join(workdir, "lrc")
+    for i in range(files):
+        folder = os.path.join(root, f"Artist {i % 50}")
+        os.makedirs(folder, exist_ok=True)
+        lines = "".join(
+            f"[{n // 60:02d}:{n % 60:02d}.{i % 100:02d}]Line {n} of song {i}\n"
+            for n in range(0, 180, 4)
+        )
+        with open(os.path.join(folder, f"Artist {i % 50} - Song {i}.lrc"), "w") as f:
+            f.write(f"[length:03:00]\n[offset:250]\n{lines}")
+
+    store = yaap.LyricsStore(os.path.join(workdir, "lyrics.db"))
+    start = time.perf_counter()
+    cold = store.import_paths([root])
+    cold_s = time.perf_counter() - start
+    start = time.perf_counter()
+    warm = store.import_paths([root])
+    warm_s = time.perf_counter() - start
+
+    tui.lyrics_store = store
+    before = dict(StubHandler.hits)
+    times = []
+    for i in range(0, files, max(1, files // 50)):
+        start = time.perf_counter()
+        tui.fetch_lyrics(f"Song {i}", f"Artist {i % 50} - Topic", 181.0)
+        times.append(time.perf_counter() - start)
+    network = StubHandler.hits.get("api", 0) - before.get("api", 0)
+    return {
+        "files": files,
+        "cold_import_s": round(cold_s, 3),
+        "files_per_s": round(cold["imported"] / cold_s) if cold_s else 0,
+        "incremental_s": round(warm_s, 3),
+        "incremental_unchanged": warm["unchanged"],
+        "lookup": stats_ms(times),
+        "network_requests": network,
+        "synced": bool(tui.synced_lyrics),
+    }
+
+
+def scenario_library(yaap, tui, workdir: str, files: int) -> Dict:
+    """Cold/incremental scans of a generated music tree, local-first search"""
+    root = os.path.join(workdir, "music")
+    per_album = 12
+    for i in range(0, files, per_album):
+        folder = os.path.join(root, f"Artist {i // 600}", f"Album {i // per_album}")
+        os.makedirs(folder)
+        for n in range(min(per_album, files - i)):
+            open(os.path.join(folder, f"{n + 1:02d} - Track {i + n}.flac"), "w").close()
+
+    library = yaap.MusicLibrary(os.path.join(workdir, "library.db"))
+    start = time.perf_counter()
+    cold = library.scan([root])
+    cold_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    library.scan([root])
+    unchanged_s = time.perf_counter() - start
+
+    touched = 0
+    for dirpath, _, names in os.walk(root):
+        for name in names[:1]:
+            with open(os.path.join(dirpath, name), "a") as f:
+                f.write("x")
+            touched += 1
+    start = time.perf_counter()
+    changed = library.scan([root])
+    changed_s = time.perf_counter() - start
+
+    searches = []
+    for i in range(50):
+        start = time.perf_counter()
+        library.search(f"track {i * 97}")
+        searches.append(time.perf_counter() - start)
+
+    # Local hits must be on screen before any provider answers
+    tui.library = library
+    start = time.perf_counter()
+    tui.start_search("Track 1234")
+    local_first_s = time.perf_counter() - start
+    local_first = bool(tui.results) and tui.results[0].get("source") == "local"
+    deadline = time.monotonic() + 10
+    while tui.searching and time.monotonic() < deadline:
+        time.sleep(0.01)
+    merged_local_first = bool(tui.results) and tui.results[0].get("source") == "local"
+
+    return {
+        "files": cold["files"],
+        "cold_scan_s": round(cold_s, 3),
+        "files_per_s": round(cold["files"] / cold_s) if cold_s else 0,
+        "unchanged_rescan_s": round(unchanged_s, 3),
+        "changed_rescan_s": round(changed_s, 3),
+        "changed_reindexed": changed["indexed"] == touched,
+        "search": stats_ms(searches),
+        "local_results_ms": round(local_first_s * 1000, 3),
+        "local_first": local_first and merged_local_first,
+        "passed": bool(
+            changed["indexed"] == touched and local_first and merged_local_first
+        ),
+    }
+
+
+def scenario_batch(yaap, workdir: str, lines: int) -> Dict:
+    """--batch with --jobs 1 vs --jobs 8 on a fresh cache, then a rerun
+    that must be served from the search cache interactive mode reads"""
+    playlist = os.path.join(workdir, "playlist.txt")
+    with open(playlist, "w") as f:
+        for i in range(lines):
+            f.write(f"Bench Artist {i} - Batch Song {i}\n")
+
+    def run(jobs: int, cache: str) -> Tuple[float, List[Dict]]:
+        # Real searches are network-bound; keep the fakes' CPU out of it
+        env = dict(os.environ, XDG_CACHE_HOME=cache, YAAP_FAKE_SEARCH_DELAY="0.5")
+        start = time.perf_counter()
+        result = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(HERE, "yaap.py"),
+                "--batch",
+                playlist,
+                "--jobs",
+                str(jobs),
+                "--rate",
+                "0",
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+        return elapsed, [json.loads(line) for line in result.stdout.splitlines()]
+
+    serial_s, serial = run(1, os.path.join(workdir, "batch1"))
+    cache = os.path.join(workdir, "batch8")
+    parallel_s, parallel = run(8, cache)
+    rerun_s, rerun = run(8, cache)
+
+    # The latency stats every worker saves must still parse
+    try:
+        with open(os.path.join(cache, "yaap", "search_latency.json")) as f:
+            stats_ok = bool(json.load(f))
+    except (OSError, ValueError):
+        stats_ok = False
+    # Interactive search reads the same key
+    index = yaap.SearchIndex(os.path.join(cache, "yaap", "index.db"))
+    providers = yaap.build_arg_parser().parse_args([]).providers
+    shared = all(
+        index.cached_search(providers, f"Bench Artist {i} - Batch Song {i}")
+        for i in range(lines)
+    )
+    resolved = sum(1 for r in parallel if r.get("best"))
+    return {
+        "lines": lines,
+        "jobs_1_s": round(serial_s, 2),
+        "jobs_8_s": round(parallel_s, 2),
+        "speedup": round(serial_s / parallel_s, 1) if parallel_s else None,
+        "resolved": resolved,
+        "rerun_s": round(rerun_s, 2),
+        "rerun_cached": sum(1 for r in rerun if r.get("cached")),
+        "latency_stats_valid": stats_ok,
+        "cache_shared_with_interactive": shared,
+        "passed": bool(
+            len(serial) == lines
+            and resolved == lines
+            and parallel_s * 2 < serial_s
+            and all(r.get("cached") for r in rerun)
+            and stats_ok
+            and shared
+        ),
+    }
+
+
+def scenario_stale_url(yaap, base: str) -> Dict:
+    """A cached stream URL the CDN refuses (403) falls back to the page URL
+    for mpv's ytdl_hook and is evicted from the resolver cache"""
+    tui = make_tui(yaap)
+    video = dict(
+        sample_results(1)[0],
+        id="stale0001",
+        url="https://youtube.com/watch?v=stale0001",
+    )
+    fmt = tui.stream_format(tui.quality_profile())
+    expire = int(time.time()) + 21600
+    tampered = f"{base}/media/{video['id']}?expire={expire}&sig=tampered"
+    tui.resolver.entries[tui.resolver.cache_key(video["id"], fmt)] = {
+        "url": tampered,
+        "headers": {},
+        "expires": expire,
+        "resolved_at": time.time(),
+    }
+    before = StubHandler.hits.get("media", 0)
+    tui.play_video(video)
+    args = list(tui.mpv_process.args) if tui.mpv_process else []
+    first_audio = wait_first_audio(tui) is not None
+    tui.stop_playback()
+    # resolve_async replaces the entry with a fresh, signed URL
+    wait_for(lambda: tui.resolver.lookup(video["id"], fmt) is not None, 5)
+    entry = tui.resolver.lookup(video["id"], fmt)
+    with open(tui.resolver.cache_file) as f:
+        on_disk = f.read()
+    fell_back = video["url"] in args and tampered not in args
+    evicted = (entry is None or entry["url"] != tampered) and tampered not in on_disk
+
+    # Resolver, warmer and UI threads all save streams.json
+    savers = [
+        threading.Thread(
+            target=lambda: [tui.resolver.save() for _ in range(50)], daemon=True
+        )
+        for _ in range(8)
+    ]
+    for thread in savers:
+        thread.start()
+    for thread in savers:
+        thread.join()
+    try:
+        with open(tui.resolver.cache_file) as f:
+            saves_ok = isinstance(json.load(f), dict)
+    except (OSError, ValueError):
+        saves_ok = False
+    return {
+        "probed": StubHandler.hits.get("media", 0) - before >= 1,
+        "mpv_got_page_url": fell_back,
+        "evicted": evicted,
+        "first_audio": first_audio,
+        "concurrent_saves_ok": saves_ok,
+        "passed": fell_back and evicted and first_audio and saves_ok,
+    }
+
+
+def scenario_trace(yaap, workdir: str, frames: int) -> Dict:
+    """Headless run with --trace: every line must be a JSON span record"""
+    trace = os.path.join(workdir, "trace.jsonl")
+    cache = os.path.join(workdir, "trace-cache")
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(HERE, "yaap.py"),
+            "--headless",
+            "--no-warm",
+            "--frames",
+            str(frames),
+            "--keys",
+            "s|bench trace|ENTER|@40|ENTER|@40",
+            "--trace",
+            trace,
+        ],
+        env=dict(os.environ, XDG_CACHE_HOME=cache),
+        capture_output=True,
+        text=True,
+    )
+    records, invalid = [], 0
+    try:
+        with open(trace) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    invalid += 1
+                    continue
+                if (
+                    isinstance(record.get("stage"), str)
+                    and isinstance(record.get("ms"), (int, float))
+                    and record["ms"] >= 0
+                ):
+                    records.append(record)
+                else:
+                    invalid += 1
+    except OSError:
+        return {"error": "no trace file", "returncode": result.returncode}
+    stages = sorted({r["stage"] for r in records})
+    return {
+        "records": len(records),
+        "invalid": invalid,
+        "stages": stages,
+        "passed": bool(
+            result.returncode == 0
+            and records
+            and not invalid
+            and "frame" in stages
+            and any(stage.startswith("search.") for stage in stages)
+            and "mpv.spawn" in stages
+        ),
+    }
+
+
+def scenario_first_audio(yaap, tui, runs: int) -> Dict:
+    tui.results = sample_results()
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        tui.play_video(tui.results[i % len(tui.results)])
+        if wait_first_audio(tui) is not None:
+            times.append(time.perf_counter() - start)
+    tui.stop_playback()
+    return {"time_to_first_audio": stats_ms(times)}
+
+
+def scenario_quality(
+    yaap, tui, runs: int, play_s: float = 1.5, link: int = 64000
+) -> Dict:
+    """Start latency and bytes moved per quality profile on a constrained
+    link (fake mpv fill rate in bytes/s); auto selection"""
+    tui.results = sample_results()
+    quality = tui.args.quality
+    os.environ["YAAP_FAKE_MPV_RATE"] = str(link)
+    report = {}
+    for offset, profile in enumerate(yaap.QUALITY_PROFILES):
+        tui.args.quality = profile
+        starts, transferred = [], []
+        for i in range(runs):
+            start = time.perf_counter()
+            tui.play_video(tui.results[(offset * runs + i) % len(tui.results)])
+            if wait_first_audio(tui) is None:
+                continue
+            starts.append(time.perf_counter() - start)
+            time.sleep(play_s)
+            transferred.append(tui.stream_bytes)
+        report[profile] = {
+            "first_audio": stats_ms(starts),
+            "kib_transferred": round(
+                statistics.mean(transferred) / 1024 if transferred else 0, 1
+            ),
+            "info": tui.stream_info,
+        }
+    tui.stop_playback()
+    tui.args.quality = quality
+    del os.environ["YAAP_FAKE_MPV_RATE"]
+
+    measured = tui.throughput.bytes_per_s
+    picks = {}
+    for label, speed in (("slow", 40e3), ("medium", 150e3), ("fast", 2e6)):
+        tui.throughput.bytes_per_s = speed
+        picks[label] = tui.throughput.pick(True)
+    tui.throughput.bytes_per_s = measured
+    report["auto"] = {
+        "measured_kib_per_s": round((measured or 0) / 1024, 1),
+        "picks": picks,
+    }
+    return report
+
+
+def scenario_seek(yaap, tui, seeks: int) -> Dict:
+    """Seek latency: optimistic UI update vs mpv's playback-restart"""
+    tui.results = sample_results()
+    tui.synced_lyrics = []
+    tui.play_video(tui.results[0])
+    if wait_first_audio(tui) is None:
+        tui.stop_playback()
+        return {"error": "no playback"}
+    while not tui.playback_duration:
+        time.sleep(0.01)
+    tui.synced_lyrics = [(float(t), f"line {t}") for t in range(0, 240, 4)]
+
+    before = len(tui.tracer.samples.get("mpv.seek", ()))
+    local, resynced = [], 0
+    for i in range(seeks):
+        target = (i * 37) % 200 + 10
+        start = time.perf_counter()
+        tui.seek(target, "absolute")
+        local.append(time.perf_counter() - start)
+        deadline = time.monotonic() + 2
+        while len(tui.tracer.samples.get("mpv.seek", ())) <= before + i:
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.001)
+        if abs(tui.playback_time - target) < 0.5 and tui.current_lyric_line == int(
+            tui.playback_time // 4
+        ):
+            resynced += 1
+    confirmed = list(tui.tracer.samples.get("mpv.seek", ()))[before:]
+
+    # Relative key-repeat bursts must land on the summed offset
+    tui.seek(100, "absolute")
+    for _ in range(5):
+        tui.seek(5)
+    time.sleep(0.3)
+    burst_ok = abs(tui.playback_time - 125) < 1.0
+    # Finished seek threads must not pile up on the session
+    tracked = len(tui.session.threads) if tui.session else 0
+    tui.stop_playback()
+
+    parsed = [
+        yaap.parse_seek(text) for text in ("+10", "-5", "90", "1:30", "50%", "0")
+    ]
+    rejected = 0
+    for text in ("foo", "1:x", "nan", ""):
+        try:
+            yaap.parse_seek(text)
+        except argparse.ArgumentTypeError:
+            rejected += 1
+    parse_ok = rejected == 4 and parsed == [
+        (10.0, "relative"),
+        (-5.0, "relative"),
+        (90.0, "absolute"),
+        (90.0, "absolute"),
+        (50.0, "absolute-percent"),
+        (0.0, "absolute"),
+    ]
+    return {
+        "ui_update": stats_ms(local),
+        "mpv_confirmed": stats_ms(confirmed),
+        "resynced": resynced,
+        "seeks": seeks,
+        "burst_ok": burst_ok,
+        "session_threads": tracked,
+        "parse_ok": parse_ok,
+        "passed": burst_ok and parse_ok and tracked < seeks,
+    }
+
+
+def scenario_resume(yaap, base: str) -> Dict:
+    """Restore a saved session: latency, cached thumbnails, zero network"""
+    previous = make_tui(yaap)
+    previous.search_query = "bench resume"
+    previous.results = sample_results()
+    for video in previous.results:
+        video["thumbnail"] = f"{base}/vi/{video['id']}/default.jpg"
+        previous.download_thumbnail(video["id"], video["thumbnail"])
+    previous.selected_index = 3
+    previous.current_video = previous.results[3]
+    previous.resume_position = 42.0
+    previous.save_session()
+
+    before = dict(StubHandler.hits)
+    tui = make_tui(yaap)
+    start = time.perf_counter()
+    tui.restore_session(fetch_lyrics=False)  # as with --resume
+    restore_s = time.perf_counter() - start
+    racing = any(t.name == "lyrics-restore" for t in threading.enumerate())
+    thumbs_hits = StubHandler.hits.get("vi", 0) - before.get("vi", 0)
+    restored = (
+        tui.search_query == "bench resume"
+        and tui.selected_index == 3
+        and tui.current_video == previous.results[3]
+        and len(tui.thumbnails) == len(previous.results)
+    )
+
+    start = time.perf_counter()
+    tui.play_video(tui.current_video, tui.resume_position)
+    first_audio = wait_first_audio(tui)
+    resume_s = time.perf_counter() - start
+    position = tui.query_mpv_property("time-pos")
+    tui.stop_playback()
+
+    def restore_done() -> bool:
+        return not any(t.name == "lyrics-restore" for t in threading.enumerate())
+
+    # Without --resume, the restored track's lyrics show while idle
+    screen = yaap.MemoryScreen(50, 160)
+    idle = make_tui(yaap, screen)
+    idle.restore_session()
+    wait_for(restore_done, 5)
+    idle.draw_frame()
+    current = idle.lyrics[idle.current_lyric_line] if idle.lyrics else ""
+    idle_lyrics = bool(current.strip()) and current.strip() in "\n".join(
+        screen.lines()
+    )
+
+    # Starting a track before a slow restore lookup returns keeps its lyrics
+    racer = make_tui(yaap)
+    load = racer.load_lyrics
+
+    def slow_restore(title, *rest):
+        if title == previous.current_video["title"]:
+            time.sleep(0.5)
+            return ["restored lyrics"], []
+        return load(title, *rest)
+
+    racer.load_lyrics = slow_restore
+    racer.restore_session()
+    racer.play_video(racer.results[0])
+    wait_for(restore_done, 5)
+    kept = "restored lyrics" not in racer.lyrics and not racer.lyrics_preview
+    racer.stop_playback()
+
+    return {
+        "restore_ms": round(restore_s * 1000, 3),
+        "restored": restored,
+        "thumbnail_requests": thumbs_hits,
+        "resume_first_audio_ms": round(resume_s * 1000, 1) if first_audio else None,
+        "resumed_at_position": bool(position and position >= 42.0),
+        "lyrics_fetch_raced": racing,
+        "idle_lyrics_shown": idle_lyrics,
+        "new_track_lyrics_kept": kept,
+        "passed": bool(
+            restored
+            and not racing
+            and first_audio
+            and position
+            and position >= 42.0
+            and idle_lyrics
+            and kept
+        ),
+    }
+
+
+def wait_for(predicate, timeout: float = 10.0) -> Optional[float]:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if predicate():
+            return time.perf_counter() - start
+        time.sleep(0.005)
+    return None
+
+
+def scenario_warmer(yaap, base: str) -> Dict:
+    """History prediction, idle warming under budgets, yield latency"""
+    tui = make_tui(yaap)
+    tui.index = yaap.SearchIndex()
+    videos = sample_results(6)
+    for video in videos:
+        video["id"] = "warm" + video["id"]
+        video["url"] = f"https://youtube.com/watch?v={video['id']}"
+        video["thumbnail"] = f"{base}/vi/{video['id']}/default.jpg"
+    a, b, c = videos[:3]
+    for follower in (b, c, b, b):
+        tui.index.mark_played(a)
+        tui.index.mark_played(follower)
+    tui.index.mark_played(a)
+    predicted = [v["id"] for v in tui.index.predict(a["id"], 3)]
+
+    tui.current_video = a
+    warmer = yaap.CacheWarmer(tui, idle_delay=0.2, prebuffer_seconds=5)
+    tui.warmer = warmer
+    tui.last_activity = time.monotonic()
+    # Foreground thumbnail traffic on another thread must not be charged
+    # to the warmer's bandwidth budget
+    pool_before = tui.http.stats["bytes"]
+    foreground = {"bytes": 0}
+    halt = threading.Event()
+
+    def fetch_foreground():
+        while not halt.is_set():
+            _, _, body = tui.http.request("GET", f"{base}/vi/foreground/default.jpg")
+            foreground["bytes"] += len(body)
+            halt.wait(0.02)
+
+    fetcher = threading.Thread(target=fetch_foreground, daemon=True)
+    fetcher.start()
+    started = time.perf_counter()
+    warmer.start()
+    warm_s = wait_for(
+        lambda: all(warmer.stats[step] >= 1 for step in yaap.CacheWarmer.STEPS)
+    )
+    halt.set()
+    fetcher.join()
+    warmer_bytes = warmer.stats["bytes"]
+    # Everything the pool saw is either the warmer's or the foreground's
+    foreground_excluded = (
+        warmer_bytes + foreground["bytes"] <= tui.http.stats["bytes"] - pool_before
+    )
+    elapsed = time.perf_counter() - started
+    fmt = tui.stream_format()
+    warmed = (
+        tui.resolver.lookup(b["id"], fmt) is not None
+        and b["id"] in tui.thumbnails
+    )
+
+    # A slow resolve in flight must be dropped as soon as the user acts
+    os.environ["YAAP_FAKE_YTDLP_DELAY"] = "3"
+    fresh = dict(videos[5], id="warmslow", url="https://youtube.com/watch?v=warmslow")
+    tui.results = [fresh]
+    tui.selected_index = 0
+    busy = wait_for(lambda: warmer.busy and ("stream", "warmslow", fmt) in warmer.done)
+    time.sleep(0.1)
+    tui.last_activity = time.monotonic()
+    yield_s = wait_for(lambda: not warmer.busy, 5)
+    del os.environ["YAAP_FAKE_YTDLP_DELAY"]
+    warmer.stop()
+    elapsed = time.perf_counter() - started
+
+    # CPU of a child the player reaps (mpv, say) is not the warmer's
+    before = warmer.cpu_clock()
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import time\nend = time.process_time() + 0.3\n"
+            "while time.process_time() < end: pass",
+        ]
+    )
+    foreign_ms = (warmer.cpu_clock() - before) * 1000
+
+    return {
+        "predicted_first": bool(predicted) and predicted[0] == b["id"],
+        "time_to_warm_ms": round(warm_s * 1000, 1) if warm_s is not None else None,
+        "warmed": warmed,
+        "cpu_ms": round(warmer.cpu_seconds * 1000, 1),
+        # Token bucket: 200 ms burst plus 10% of wall time
+        "cpu_budget_ok": warmer.cpu_seconds <= 0.2 + 0.1 * elapsed,
+        "bytes": warmer.stats["bytes"],
+        "foreground_bytes": foreground["bytes"],
+        "foreground_excluded": foreground_excluded,
+        "yield_ms": round(yield_s * 1000, 1) if busy is not None and yield_s else None,
+        "yielded": warmer.stats["yielded"],
+        "foreign_child_cpu_ms": round(foreign_ms, 1),
+        "passed": bool(
+            warmed
+            and foreground_excluded
+            and warmer.cpu_seconds <= 0.2 + 0.1 * elapsed
+            and yield_s is not None
+            and foreign_ms < 100
+        ),
+    }
+
+
+def scenario_ipc(yaap, tui, calls: int) -> Dict:
+    tui.results = sample_results()
+    tui.play_video(tui.results[0])
+    wait_first_audio(tui)
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        tui.query_mpv_property("time-pos")
+        times.append(time.perf_counter() - start)
+    tui.stop_playback()
+    return {"get_property": stats_ms(times)}
+
+
+def scenario_ipc_daemon(yaap, workdir: str, calls: int) -> Dict:
+    """Daemon attach and round-trip latency, two concurrent watchers, and
+    commands that stay responsive while a slow play-by-query searches"""
+    run_dir = os.path.join(workdir, "run")
+    os.makedirs(run_dir, exist_ok=True)
+    env = dict(os.environ, XDG_RUNTIME_DIR=run_dir, YAAP_FAKE_SEARCH_DELAY="1")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "yaap.py"), "--no-warm", "daemon"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    client = yaap.DaemonClient(os.path.join(run_dir, "yaap.sock"), timeout=10)
+    try:
+        startup = wait_for(client.alive, 10)
+        if startup is None:
+            return {"error": "daemon did not start"}
+
+        # Attach = connect a watcher and receive the full state
+        attach = []
+        for _ in range(5):
+            first = threading.Event()
+            start = time.perf_counter()
+            client.watch(lambda changes: first.set())
+            if first.wait(5):
+                attach.append(time.perf_counter() - start)
+
+        status = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            client.call("status")
+            status.append(time.perf_counter() - start)
+
+        seen: List[List[str]] = [[], []]
+        for box in seen:
+            client.watch(
+                lambda changes, box=box: changes.get("current_video")
+                and box.append(changes["current_video"]["id"])
+            )
+        played: List = []
+        search = threading.Thread(
+            target=lambda: played.append(client.call("play", query="bench daemon")),
+            daemon=True,
+        )
+        search.start()
+        time.sleep(0.2)
+        # seek takes the command lock; it must not wait for the search
+        during = []
+        while search.is_alive() and len(during) < 100:
+            start = time.perf_counter()
+            client.call("seek", target=0, mode="relative")
+            during.append(time.perf_counter() - start)
+            time.sleep(0.02)
+        search.join(15)
+        playing_id = played[0]["id"] if played and played[0] else None
+        both = wait_for(
+            lambda: all(playing_id in box for box in seen), 5
+        ) is not None and playing_id is not None
+    finally:
+        try:
+            client.call("shutdown", timeout=2)
+        except Exception:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    attach_stats, during_stats = stats_ms(attach), stats_ms(during)
+    return {
+        "startup_ms": round(startup * 1000, 1),
+        "attach": attach_stats,
+        "status": stats_ms(status),
+        "command_during_search": during_stats,
+        "both_watchers_saw_play": both,
+        "passed": bool(
+            both
+            and len(attach) == 5
+            and attach_stats["p95_ms"] < 100
+            and during_stats
+            and during_stats["p95_ms"] < 100
+        ),
+    }
+
+
+def playback_children() -> int:
+    """Live mpv/cava children (the fakes run as `python <path>/mpv ...`)"""
+    count = 0
+    task_dir = f"/proc/{os.getpid()}/task"
+    try:
+        pids = set()
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, "children")) as f:
+                pids.update(f.read().split())
+        for pid in pids:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                argv = f.read().split(b"\0")
+            names = {os.path.basename(a) for a in argv[:2]}
+            if names & {b"mpv", b"cava"}:
+                count += 1
+    except OSError:
+        pass
+    return count
+
+
+def scenario_skip_stress(yaap, tui, skips: int) -> Dict:
+    """Rapid n/p skipping must not pile up threads or processes"""
+    tui.results = sample_results()
+    baseline_threads = threading.active_count()
+    max_threads = max_children = max_playback = 0
+    start = time.perf_counter()
+    for i in range(skips):
+        tui.play_video(tui.results[i % len(tui.results)])
+        max_threads = max(max_threads, threading.active_count())
+        max_children = max(max_children, yaap.child_process_count() or 0)
+        max_playback = max(max_playback, playback_children())
+    elapsed = time.perf_counter() - start
+    tui.stop_playback()
+    time.sleep(0.2)
+    leftover_playback = playback_children()
+    # Stream prefetches are bounded by the number of distinct results
+    passed = (
+        max_threads <= baseline_threads + 2 * len(tui.results) + 4
+        and max_playback <= 2
+        and leftover_playback == 0
+    )
+    return {
+        "skips": skips,
+        "per_skip_ms": round(elapsed / skips * 1000, 3),
+        "baseline_threads": baseline_threads,
+        "max_threads": max_threads,
+        "max_children": max_children,
+        "max_playback_children": max_playback,
+        "leftover_playback_children": leftover_playback,
+        "passed": passed,
+    }
+
+
+def scenario_memory(yaap, base: str) -> Dict:
+    tracemalloc.start()
+    tui = make_tui(yaap)
+    results = tui.fanout.run("memory bench")
+    for video in results:
+        tui.download_thumbnail(video["id"], video["thumbnail"])
+    tui.play_video(results[0])
+    wait_first_audio(tui)
+    fill_render_state(tui)
+    tui.stop_playback()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "traced_current_kib": round(current / 1024, 1),
+        "traced_peak_kib": round(peak / 1024, 1),
+        "maxrss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def start_tls_server(workdir: str):
+    """HTTPS copy of the stub server with a throwaway self-signed cert"""
+    openssl = shutil.which("openssl")
+    if not openssl:
+        return None, None
+    cert = os.path.join(workdir, "cert.pem")
+    key = os.path.join(workdir, "key.pem")
+    result = subprocess.run(
+        [
+            openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        return None, None
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(cert, key)
+    server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, ssl.create_default_context(cafile=cert)
+
+
+def scenario_http_pool(yaap, workdir: str, requests: int) -> Dict:
+    """Per-request cost with a fresh TLS handshake vs the keep-alive pool"""
+    server, client_ctx = start_tls_server(workdir)
+    if server is None:
+        return {"skipped": "openssl not available"}
+    base = f"https://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/vi/pool{i:04d}/default.jpg" for i in range(requests)]
+
+    fresh = []
+    for url in urls:
+        start = time.perf_counter()
+        with urllib.request.urlopen(url, context=client_ctx, timeout=5) as resp:
+            resp.read()
+        fresh.append(time.perf_counter() - start)
+
+    pool = yaap.HTTPPool(ssl_context=client_ctx)
+    pooled = []
+    for url in urls:
+        start = time.perf_counter()
+        pool.get(url)
+        pooled.append(time.perf_counter() - start)
+
+    path = os.path.join(workdir, "conditional.jpg")
+    pool.fetch_cached(urls[0], path)
+    start = time.perf_counter()
+    pool.fetch_cached(urls[0], path)
+    revalidate = time.perf_counter() - start
+
+    # A CDN that accepts but never answers must not hold up play_video for
+    # the pool's 8 s timeout
+    stalled = socket.socket()
+    stalled.bind(("127.0.0.1", 0))
+    stalled.listen(8)
+    resolver = yaap.StreamResolver(http=pool, probe_timeout=0.3)
+    start = time.perf_counter()
+    resolver.probe({"url": f"http://127.0.0.1:{stalled.getsockname()[1]}/v"})
+    probe_stalled = time.perf_counter() - start
+    stalled.close()
+
+    pool.close()
+    server.shutdown()
+    return {
+        "fresh_connection": stats_ms(fresh),
+        "pooled": stats_ms(pooled),
+        "pool_connects": pool.stats["connects"],
+        "pool_requests": pool.stats["requests"],
+        "revalidate_304_ms": round(revalidate * 1000, 3),
+        "probe_stalled_ms": round(probe_stalled * 1000, 1),
+        "passed": probe_stalled < 1.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=HERE,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def flatten(data, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict, current: Dict):
+    old = flatten(baseline.get("scenarios", {}))
+    new = flatten(current.get("scenarios", {}))
+    print(
+        f"\n{'metric':<52}{'baseline':>12}{'current':>12}{'change':>9}",
+        file=sys.stderr,
+    )
+    for name in sorted(set(old) & set(new)):
+        if name.endswith(".n"):
+            continue
+        change = ""
+        if old[name]:
+            change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%"
+        print(
+            f"{name:<52}{old[name]:>12}{new[name]:>12}{change:>9}",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YAAP benchmark suite")
+    parser.add_argument("--output", metavar="FILE", help="write JSON report")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="print changes against a report"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="fewer iterations per scenario"
+    )
+    args = parser.parse_args()
+    scale = 1 if args.quick else 4
+
+    workdir = tempfile.mkdtemp(prefix="yaap_bench_")
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir)
+    install_fakes(bin_dir)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["XDG_CACHE_HOME"] = os.path.join(workdir, "cache")
+
+    sys.path.insert(0, HERE)
+    import yaap
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": {},
+    }
+    scenarios = report["scenarios"]
+
+    # Fork for the pty before any threads exist
+    scenarios["render_curses"] = scenario_render_curses(yaap, 100 * scale)
+    scenarios["render_headless"] = scenario_render_headless(yaap, 100 * scale)
+    scenarios["layout"] = scenario_layout(yaap, 100 * scale)
+    scenarios["profiler"] = scenario_profiler(yaap, workdir, 500 * scale)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    os.environ["YAAP_BENCH_HTTP"] = base
+    yaap.LRCLIB_URL = base
+
+    tui = make_tui(yaap)
+    scenarios["search"] = scenario_search(yaap, tui, 3 * scale)
+    scenarios["index"] = scenario_index(yaap, 100000, 50 * scale)
+    scenarios["thumbnails"] = scenario_thumbnails(yaap, tui, 25 * scale, base)
+    scenarios["http_pool"] = scenario_http_pool(yaap, workdir, 25 * scale)
+    scenarios["lyrics"] = scenario_lyrics(yaap, tui, 5 * scale)
+    scenarios["lyrics_import"] = scenario_lyrics_import(
+        yaap, tui, workdir, 500 * scale
+    )
+    scenarios["library"] = scenario_library(yaap, tui, workdir, 12500 * scale)
+    scenarios["batch"] = scenario_batch(yaap, workdir, 16 * scale)
+    scenarios["trace"] = scenario_trace(yaap, workdir, 100 * scale)
+    scenarios["first_audio"] = scenario_first_audio(yaap, tui, 2 * scale)
+    scenarios["stale_url"] = scenario_stale_url(yaap, base)
+    scenarios["quality"] = scenario_quality(yaap, tui, scale)
+    scenarios["seek"] = scenario_seek(yaap, tui, 25 * scale)
+    scenarios["resume"] = scenario_resume(yaap, base)
+    scenarios["warmer"] = scenario_warmer(yaap, base)
+    scenarios["ipc"] = scenario_ipc(yaap, tui, 100 * scale)
+    scenarios["ipc_daemon"] = scenario_ipc_daemon(yaap, workdir, 100 * scale)
+    scenarios["skip_stress"] = scenario_skip_stress(yaap, tui, 200)
+    scenarios["memory"] = scenario_memory(yaap, base)
+
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+    # Any scenario that checks behaviour (or broke) fails the run
+    failed = [
+        name
+        for name, result in scenarios.items()
+        if result.get("passed") is False or "error" in result
+    ]
+    if failed:
+        print("failed: " + ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,16 +11,2288 @@ import os
 import tempfile
 import urllib.request
 import urllib.parse
+import urllib.error
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import sys
 from pathlib import Path
 import socket  
+import sqlite3
+import queue
+import argparse
+import itertools
+import collections
+import contextlib
+import concurrent.futures
+import http.client
+import ssl
+import hashlib
+import shutil
+import unicodedata
+import functools
+import marshal
+import math
+
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+
+LRCLIB_URL = os.environ.get("YAAP_LRCLIB_URL", "https://lrclib.net")
+
+
+def cache_dir(*parts: str) -> str:
+    """Persistent cache directory ($XDG_CACHE_HOME/yaap)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        Path.home(), ".cache"
+    )
+    path = os.path.join(base, "yaap", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_json_atomic(path: str, data):
+    """Replace path with data as JSON. Each writer gets its own temp file,
+    so concurrent saves (threads or processes) can't interleave."""
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + "."
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
 
 
-class YouTubeTUI:
+class Tracer:
+    """Per-stage latency spans with an optional JSON-lines trace file"""
+
+    def __init__(self, trace_file: Optional[str] = None, keep: int = 200):
+        self.keep = keep
+        self.samples: Dict[str, collections.deque] = {}
+        self.lock = threading.Lock()
+        self.sink = open(trace_file, "a", buffering=1) if trace_file else None
+
+    @contextlib.contextmanager
+    def span(self, stage: str, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def record(self, stage: str, seconds: float, **fields):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = collections.deque(
+                    maxlen=self.keep
+                )
+            samples.append(seconds)
+            if self.sink is not None:
+                event = {
+                    "ts": round(time.time(), 6),
+                    "stage": stage,
+                    "ms": round(seconds * 1000, 3),
+                    "thread": threading.current_thread().name,
+                }
+                event.update(fields)
+                try:
+                    self.sink.write(json.dumps(event) + "\n")
+                except Exception:
+                    pass
+
+    def summary(self) -> List[Tuple[str, float, float, int]]:
+        """(stage, p50, p95, count) for every stage, in seconds"""
+        with self.lock:
+            snapshot = {k: sorted(v) for k, v in self.samples.items()}
+        rows = []
+        for stage, values in sorted(snapshot.items()):
+            if not values:
+                continue
+            p50 = values[len(values) // 2]
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            rows.append((stage, p50, p95, len(values)))
+        return rows
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+
+# Per-session generation / pool counters, and the video id of thumbnail
+# workers, so samples fold into one root per kind of thread
+THREAD_ID = re.compile(r"-[\d_]+(?= |$)|(?<=^thumbnail)-[\w-]{11}$")
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples every thread's stack via
+    sys._current_frames() at `rate` Hz from a background thread.
+
+    Writes collapsed stacks (one "thread;frame;frame count" line per
+    stack, for flamegraph.pl / speedscope) and a pstats file built from
+    the main thread's samples.
+    """
+
+    def __init__(self, rate: float = 100.0):
+        self.interval = 1.0 / max(1.0, rate)
+        self.stacks: collections.Counter = collections.Counter()
+        self.main_stacks: collections.Counter = collections.Counter()
+        # Stacks are tuples of id(code): hashing a code object hashes its
+        # constants, nested code included: ~0.1 ms for a <module> frame
+        self.codes: Dict[int, object] = {}
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.main_ident = threading.main_thread().ident
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.sample_loop, name="profiler", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def sample_loop(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self.stop_event.wait(self.interval):
+            started = time.thread_time()
+            frames = sys._current_frames()
+            if not frames.keys() <= names.keys():
+                # Thread pools keep names like "thumbnail-<id>" or "Thread-7";
+                # fold those so each kind of worker gets one flame graph root
+                names = {
+                    t.ident: THREAD_ID.sub("", t.name)
+                    for t in threading.enumerate()
+                }
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                codes = []
+                while frame is not None:
+                    code = frame.f_code
+                    # Holding the code keeps its id from being reused
+                    self.codes.setdefault(id(code), code)
+                    codes.append(id(code))
+                    frame = frame.f_back
+                stack = tuple(reversed(codes))
+                self.stacks[(names.get(ident, str(ident)), stack)] += 1
+                if ident == self.main_ident:
+                    self.main_stacks[stack] += 1
+            self.samples += 1
+            self.cpu_seconds += time.thread_time() - started
+
+    @staticmethod
+    def label(code) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as f:
+            for (thread, stack), count in self.stacks.most_common():
+                frames = ";".join(
+                    [thread] + [self.label(self.codes[c]) for c in stack]
+                )
+                f.write(f"{frames} {count}\n")
+
+    def write_pstats(self, path: str):
+        """Marshal the dict pstats.Stats() loads: func -> (cc, nc, tt, ct,
+        callers). Every sample counts as one call of each frame on it."""
+        stats: Dict[tuple, list] = {}
+        callers: Dict[tuple, Dict[tuple, list]] = {}
+        for stack, count in self.main_stacks.items():
+            seconds = count * self.interval
+            codes = [self.codes[c] for c in stack]
+            keys = [(c.co_filename, c.co_firstlineno, c.co_name) for c in codes]
+            for depth, key in enumerate(keys):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0])
+                leaf = depth == len(keys) - 1
+                if key not in keys[:depth]:
+                    entry[0] += count
+                    entry[3] += seconds
+                entry[1] += count
+                if leaf:
+                    entry[2] += seconds
+                if depth:
+                    edge = callers.setdefault(key, {}).setdefault(
+                        keys[depth - 1], [0, 0, 0.0, 0.0]
+                    )
+                    edge[0] += count
+                    edge[1] += count
+                    edge[2] += seconds if leaf else 0.0
+                    edge[3] += seconds
+        data = {
+            key: (
+                cc, nc, tt, ct,
+                {k: tuple(v) for k, v in callers.get(key, {}).items()},
+            )
+            for key, (cc, nc, tt, ct) in stats.items()
+        }
+        with open(path, "wb") as f:
+            marshal.dump(data, f)
+
+    def write(self, prefix: str) -> List[str]:
+        """Write <prefix>.collapsed and <prefix>.pstats; returns the paths"""
+        paths = [prefix + ".collapsed", prefix + ".pstats"]
+        self.write_collapsed(paths[0])
+        self.write_pstats(paths[1])
+        return paths
+
+
+def child_process_count() -> Optional[int]:
+    """Number of live child processes (Linux /proc only)"""
+    try:
+        pids = set()
+        task_dir = f"/proc/{os.getpid()}/task"
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, "children")) as f:
+                pids.update(f.read().split())
+        return len(pids)
+    except Exception:
+        return None
+
+
+class HTTPPool:
+    """Keep-alive HTTP(S) connections shared by thumbnail and lyrics fetches.
+
+    Idle connections are kept per (scheme, host, port) and reused, so a
+    page of thumbnails from i.ytimg.com costs one TLS handshake instead
+    of ten. The number of connections in use is capped overall and per
+    host.
+    """
+
+    RETRYABLE = (
+        http.client.RemoteDisconnected,
+        http.client.BadStatusLine,
+        ConnectionResetError,
+        BrokenPipeError,
+    )
+
+    def __init__(
+        self,
+        max_connections: int = 8,
+        max_per_host: int = 4,
+        timeout: float = 8,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.max_per_host = max_per_host
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.host_slots: Dict[Tuple, threading.BoundedSemaphore] = {}
+        self.idle: Dict[Tuple, List[http.client.HTTPConnection]] = {}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "connects": 0, "reused": 0, "bytes": 0}
+        self.local = threading.local()
+
+    def thread_bytes(self) -> int:
+        """Body bytes received by requests made on the calling thread"""
+        return getattr(self.local, "bytes", 0)
+
+    @staticmethod
+    def origin(url: str) -> Tuple[Tuple, str]:
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme or "http"
+        port = parsed.port or (443 if scheme == "https" else 80)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        return (scheme, parsed.hostname, port), path
+
+    def connect(self, key: Tuple) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        with self.lock:
+            self.stats["connects"] += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self.ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def checkout(self, key: Tuple) -> Tuple[http.client.HTTPConnection, bool]:
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                self.stats["reused"] += 1
+                return idle.pop(), True
+        return self.connect(key), False
+
+    @staticmethod
+    def set_timeout(conn: http.client.HTTPConnection, timeout: float):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def checkin(self, key: Tuple, conn: http.client.HTTPConnection):
+        with self.lock:
+            self.idle.setdefault(key, []).append(conn)
+
+    def host_slot(self, key: Tuple) -> threading.BoundedSemaphore:
+        with self.lock:
+            slot = self.host_slots.get(key)
+            if slot is None:
+                slot = self.host_slots[key] = threading.BoundedSemaphore(
+                    self.max_per_host
+                )
+            return slot
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        redirects: int = 3,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Send a request; returns (status, lower-cased headers, body).
+        `timeout` overrides the pool's socket timeout for this request."""
+        key, path = self.origin(url)
+        limit = self.timeout if timeout is None else timeout
+        headers = dict(headers or {})
+        headers.setdefault("User-Agent", "yaap")
+        host_slot = self.host_slot(key)
+
+        with self.slots, host_slot:
+            conn, reused = self.checkout(key)
+            while True:
+                self.set_timeout(conn, limit)
+                try:
+                    conn.request(method, path, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    break
+                except self.RETRYABLE:
+                    # The server dropped an idle keep-alive connection
+                    conn.close()
+                    if not reused:
+                        raise
+                    conn, reused = self.connect(key), False
+                except Exception:
+                    conn.close()
+                    raise
+
+            with self.lock:
+                self.stats["requests"] += 1
+                self.stats["bytes"] += len(body)
+            self.local.bytes = self.thread_bytes() + len(body)
+            if resp.will_close:
+                conn.close()
+            else:
+                self.set_timeout(conn, self.timeout)
+                self.checkin(key, conn)
+
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        if resp.status in (301, 302, 303, 307, 308) and redirects > 0:
+            location = urllib.parse.urljoin(url, resp_headers.get("location", ""))
+            return self.request("GET", location, headers, redirects - 1, timeout)
+        return resp.status, resp_headers, body
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> bytes:
+        status, _, body = self.request("GET", url, headers)
+        if status >= 400:
+            raise urllib.error.HTTPError(url, status, "HTTP error", None, None)
+        return body
+
+    def fetch_cached(
+        self, url: str, path: str, max_age: float = 0
+    ) -> Optional[bytes]:
+        """GET url into path, revalidating with ETag / Last-Modified.
+
+        A copy younger than max_age is used without a request; on network
+        errors the stale copy is returned if there is one.
+        """
+        meta_path = path + ".meta"
+        meta: Dict = {}
+        cached: Optional[bytes] = None
+        try:
+            with open(path, "rb") as f:
+                cached = f.read()
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if cached is not None and time.time() - meta.get("fetched", 0) < max_age:
+            return cached
+
+        headers = {}
+        if cached is not None and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if cached is not None and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            status, resp_headers, body = self.request("GET", url, headers)
+        except Exception:
+            return cached
+
+        if status == 304 and cached is not None:
+            body = cached
+        elif status != 200:
+            return cached
+        else:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+            meta = {
+                "etag": resp_headers.get("etag"),
+                "last_modified": resp_headers.get("last-modified"),
+            }
+
+        meta["fetched"] = time.time()
+        try:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        except OSError:
+            pass
+        return body
+
+    def warm(self, urls: List[str]):
+        """Open (TCP + TLS) one connection per origin ahead of time"""
+        for url in urls:
+            key, _ = self.origin(url)
+            with self.lock:
+                if self.idle.get(key):
+                    continue
+            try:
+                conn = self.connect(key)
+                conn.connect()
+                self.checkin(key, conn)
+            except Exception:
+                pass
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+TITLE_NOISE = re.compile(
+    r"\s*[\(\[][^\)\]]*(official|video|audio|lyric|visuali[sz]er|\bhd\b|\bhq\b|"
+    r"\b4k\b|remaster|\bmv\b|explicit|clean|full song)[^\)\]]*[\)\]]",
+    re.IGNORECASE,
+)
+FEATURING = re.compile(r"\s*[\(\[]?\b(feat|ft|featuring)\b\.?.*$", re.IGNORECASE)
+CHANNEL_NOISE = re.compile(r"\s*(- topic|vevo|official)$", re.IGNORECASE)
+TITLE_SEPARATOR = re.compile(r"\s+[-–—]\s+")
+
+
+def parse_duration(text) -> Optional[float]:
+    """'3:25' / '1:02:03' / 205 -> seconds"""
+    if isinstance(text, (int, float)):
+        return float(text) or None
+    try:
+        seconds = 0.0
+        for part in str(text).split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds or None
+    except ValueError:
+        return None
+
+
+def split_artist_title(title: str, channel: str = "") -> Tuple[str, str]:
+    """Turn a YouTube title like 'Artist - Song (Official Video) [HD]'
+    into ('Artist', 'Song'), falling back to the channel as artist."""
+    clean = TITLE_NOISE.sub("", title)
+    clean = re.sub(r"\s*\|.*$", "", clean).strip()
+    parts = TITLE_SEPARATOR.split(clean, maxsplit=1)
+    if len(parts) == 2:
+        artist, track = parts
+    else:
+        artist, track = CHANNEL_NOISE.sub("", channel or ""), clean
+    artist = FEATURING.sub("", artist).strip(" \"'")
+    track = FEATURING.sub("", track).strip(" \"'")
+    return artist, track
+
+
+LRC_TIMESTAMP = re.compile(r"\[(\d+):(\d+(?:[.:]\d+)?)\]")
+LRC_TAG = re.compile(r"^\[([a-z#]+):(.*)\]$", re.IGNORECASE)
+LRC_WORD_TIME = re.compile(r"<\d+:\d+(?:[.:]\d+)?>")
+
+
+def parse_lrc(text: str) -> Tuple[List[tuple], Dict[str, str]]:
+    """Parse LRC into a sorted [(seconds, text)] timeline plus ID tags.
+
+    Handles several timestamps per line, [mm:ss], [mm:ss.xx] and
+    [mm:ss:xx] forms, enhanced <mm:ss.xx> word stamps and [offset:ms].
+    """
+    timeline: List[tuple] = []
+    tags: Dict[str, str] = {}
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        stamps = LRC_TIMESTAMP.findall(line)
+        if not stamps:
+            tag = LRC_TAG.match(line)
+            if tag:
+                tags[tag.group(1).lower()] = tag.group(2).strip()
+            continue
+        lyric = LRC_WORD_TIME.sub("", LRC_TIMESTAMP.sub("", line)).strip()
+        if not lyric:
+            continue
+        for minutes, seconds in stamps:
+            timeline.append((int(minutes) * 60 + float(seconds.replace(":", ".")), lyric))
+
+    try:
+        # A positive offset makes lyrics show up sooner
+        offset = int(tags.get("offset", "0")) / 1000.0
+    except ValueError:
+        offset = 0.0
+    if offset:
+        timeline = [(max(0.0, t - offset), lyric) for t, lyric in timeline]
+    timeline.sort(key=lambda x: x[0])
+    return timeline, tags
+
+
+def normalize_key(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive matching key"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def parse_lyrics_file(path: str) -> Optional[Dict]:
+    """Parse one .lrc/.txt file into a LyricsStore record"""
+    try:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    timeline, tags = [], {}
+    if path.lower().endswith(".lrc"):
+        timeline, tags = parse_lrc(text)
+    plain = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    if timeline:
+        plain = [lyric for _, lyric in timeline]
+    elif path.lower().endswith(".lrc"):
+        plain = [ln for ln in plain if not LRC_TAG.match(ln)]
+    if not plain:
+        return None
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    artist, title = tags.get("ar", ""), tags.get("ti", "")
+    if not title:
+        parts = TITLE_SEPARATOR.split(stem, maxsplit=1)
+        if len(parts) == 2:
+            artist = artist or parts[0]
+            title = parts[1]
+        else:
+            title = stem
+            artist = artist or os.path.basename(os.path.dirname(path))
+
+    return {
+        "path": path,
+        "mtime": mtime,
+        "artist": normalize_key(artist),
+        "title": normalize_key(title),
+        "duration": parse_duration(tags.get("length", "")),
+        "synced": timeline,
+        "plain": plain,
+    }
+
+
+class LyricsStore:
+    """Offline lyrics imported from .lrc/.txt files, matched by
+    normalized artist/title and duration"""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS lyrics ("
+                "path TEXT PRIMARY KEY, mtime REAL, artist TEXT, title TEXT, "
+                "duration REAL, synced TEXT, plain TEXT)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS lyrics_title ON lyrics (title, artist)"
+            )
+            self.db.commit()
+
+    def known_mtimes(self) -> Dict[str, float]:
+        with self.lock:
+            return dict(self.db.execute("SELECT path, mtime FROM lyrics"))
+
+    def add(self, records: List[Dict]):
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO lyrics "
+                "(path, mtime, artist, title, duration, synced, plain) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        r["path"],
+                        r["mtime"],
+                        r["artist"],
+                        r["title"],
+                        r["duration"],
+                        json.dumps(r["synced"]),
+                        json.dumps(r["plain"]),
+                    )
+                    for r in records
+                ],
+            )
+            self.db.commit()
+
+    def import_paths(self, roots: List[str], jobs: Optional[int] = None) -> Dict:
+        """Walk roots and (re)import changed lyric files in parallel"""
+        known = self.known_mtimes()
+        paths = []
+        for root in roots:
+            for dirpath, _, files in os.walk(root):
+                for name in files:
+                    if name.lower().endswith((".lrc", ".txt")):
+                        paths.append(os.path.join(os.path.abspath(dirpath), name))
+
+        changed = []
+        for path in paths:
+            try:
+                if known.get(path) != os.path.getmtime(path):
+                    changed.append(path)
+            except OSError:
+                continue
+
+        imported = failed = 0
+        batch: List[Dict] = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            for record in pool.map(parse_lyrics_file, changed, chunksize=64):
+                if record is None:
+                    failed += 1
+                    continue
+                batch.append(record)
+                if len(batch) >= 500:
+                    self.add(batch)
+                    imported += len(batch)
+                    batch = []
+        if batch:
+            self.add(batch)
+            imported += len(batch)
+
+        return {
+            "scanned": len(paths),
+            "imported": imported,
+            "unchanged": len(paths) - len(changed),
+            "failed": failed,
+        }
+
+    def lookup(
+        self, artist: str, title: str, duration: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Best stored match: same title, artist if known, closest duration"""
+        title_key = normalize_key(title)
+        if not title_key:
+            return None
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT artist, duration, synced, plain FROM lyrics WHERE title = ?",
+                (title_key,),
+            ).fetchall()
+        if not rows:
+            return None
+
+        artist_key = normalize_key(artist)
+        if artist_key:
+            matching = [r for r in rows if r[0] == artist_key]
+            if not matching:
+                return None
+            rows = matching
+
+        def delta(row) -> float:
+            if duration and row[1]:
+                return abs(row[1] - duration)
+            return 30.0
+
+        best = min(rows, key=delta)
+        if duration and best[1] and delta(best) > 15:
+            return None
+        return {
+            "synced": [tuple(item) for item in json.loads(best[2])],
+            "plain": json.loads(best[3]),
+        }
+
+
+AUDIO_EXTENSIONS = (
+    ".mp3", ".flac", ".ogg", ".opus", ".m4a", ".aac", ".wav", ".wma", ".alac",
+    ".aiff", ".ape", ".mka", ".webm",
+)
+TRACK_NUMBER = re.compile(r"^\s*(?:\d{1,3}\s*[.\-_]\s*|0\d\s+)")
+
+
+def read_audio_tags(path: str, use_ffprobe: bool = False) -> Dict:
+    """Title/artist/album/duration from tags, falling back to the path
+    (Artist/Album/01 Title.ext or 'Artist - Title.ext')"""
+    tags: Dict = {}
+    if mutagen is not None:
+        try:
+            audio = mutagen.File(path, easy=True)
+            if audio is not None:
+                for key in ("title", "artist", "album"):
+                    if audio.get(key):
+                        tags[key] = str(audio[key][0])
+                if getattr(audio.info, "length", None):
+                    tags["duration"] = float(audio.info.length)
+        except Exception:
+            pass
+    elif use_ffprobe:
+        try:
+            out = subprocess.run(
+                ["ffprobe", "-v", "quiet", "-print_format", "json",
+                 "-show_format", path],
+                capture_output=True,
+                text=True,
+                timeout=10,
+            ).stdout
+            fmt = json.loads(out).get("format", {})
+            found = {k.lower(): v for k, v in fmt.get("tags", {}).items()}
+            for key in ("title", "artist", "album"):
+                if found.get(key):
+                    tags[key] = found[key]
+            if fmt.get("duration"):
+                tags["duration"] = float(fmt["duration"])
+        except Exception:
+            pass
+
+    if not tags.get("title"):
+        stem = TRACK_NUMBER.sub("", Path(path).stem) or Path(path).stem
+        parts = TITLE_SEPARATOR.split(stem, maxsplit=1)
+        if len(parts) == 2:
+            tags.setdefault("artist", parts[0].strip())
+            tags["title"] = parts[1].strip()
+        else:
+            tags["title"] = stem.strip()
+            parent = Path(path).parent
+            tags.setdefault("album", parent.name)
+            tags.setdefault("artist", parent.parent.name)
+    return tags
+
+
+class MusicLibrary:
+    """Persistent index of local audio files, searchable like a provider.
+
+    Rescans are incremental: files whose mtime and size are unchanged
+    are not re-tagged, vanished files are dropped.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.has_fts = True
+        with self.lock:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, mtime REAL, size INTEGER, "
+                "title TEXT, artist TEXT, album TEXT, duration REAL)"
+            )
+            try:
+                self.db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5("
+                    "title, artist, album, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')"
+                )
+            except sqlite3.OperationalError:
+                self.has_fts = False
+            self.db.commit()
+
+    @staticmethod
+    def scan_dir(directory: str) -> Tuple[Dict[str, tuple], List[str]]:
+        """Audio files (path -> (mtime, size)) and subdirectories of one dir"""
+        files, subdirs = {}, []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                            st = entry.stat()
+                            files[entry.path] = (st.st_mtime, st.st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
+
+    def walk(self, roots: List[str], pool) -> Dict[str, tuple]:
+        """Walk all roots in parallel, one task per directory"""
+        found: Dict[str, tuple] = {}
+        pending = {
+            pool.submit(self.scan_dir, os.path.abspath(os.path.expanduser(r)))
+            for r in roots
+        }
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                files, subdirs = future.result()
+                found.update(files)
+                pending |= {pool.submit(self.scan_dir, d) for d in subdirs}
+        return found
+
+    def scan(self, roots: List[str], jobs: int = 8) -> Dict:
+        """Index new and changed files under roots, drop removed ones"""
+        with self.lock:
+            known = {
+                row[0]: (row[1], row[2])
+                for row in self.db.execute("SELECT path, mtime, size FROM files")
+            }
+        use_ffprobe = mutagen is None and shutil.which("ffprobe") is not None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+            found = self.walk(roots, pool)
+            changed = [p for p, stat in found.items() if known.get(p) != stat]
+            prefixes = tuple(
+                os.path.join(os.path.abspath(os.path.expanduser(r)), "")
+                for r in roots
+            )
+            removed = [p for p in known if p.startswith(prefixes) and p not in found]
+
+            batch = []
+            tagged = pool.map(lambda p: (p, read_audio_tags(p, use_ffprobe)), changed)
+            for path, tags in tagged:
+                batch.append((path, found[path], tags))
+                if len(batch) >= 1000:
+                    self.store(batch, [])
+                    batch = []
+            self.store(batch, removed)
+
+        return {
+            "files": len(found),
+            "indexed": len(changed),
+            "unchanged": len(found) - len(changed),
+            "removed": len(removed),
+        }
+
+    def store(self, batch: List[tuple], removed: List[str]):
+        """Replace rows of changed files; FTS rows share the files rowid"""
+        stale = [(path,) for path, _, _ in batch] + [(p,) for p in removed]
+        with self.lock:
+            if self.has_fts:
+                self.db.executemany(
+                    "DELETE FROM files_fts WHERE rowid = "
+                    "(SELECT rowid FROM files WHERE path = ?)",
+                    stale,
+                )
+            self.db.executemany("DELETE FROM files WHERE path = ?", stale)
+            self.db.executemany(
+                "INSERT INTO files (path, mtime, size, title, artist, album, "
+                "duration) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        path,
+                        stat[0],
+                        stat[1],
+                        tags.get("title", ""),
+                        tags.get("artist", ""),
+                        tags.get("album", ""),
+                        tags.get("duration"),
+                    )
+                    for path, stat, tags in batch
+                ],
+            )
+            if self.has_fts:
+                self.db.executemany(
+                    "INSERT INTO files_fts (rowid, title, artist, album) "
+                    "SELECT rowid, title, artist, album FROM files "
+                    "WHERE path = ?",
+                    [(path,) for path, _, _ in batch],
+                )
+            self.db.commit()
+
+    @staticmethod
+    def as_result(row: tuple) -> Dict:
+        """Shape a files row like a search result"""
+        path, title, artist, album, duration = row
+        text = ""
+        if duration:
+            text = f"{int(duration) // 60}:{int(duration) % 60:02d}"
+        return {
+            "id": "local:" + hashlib.sha1(path.encode()).hexdigest()[:16],
+            "title": f"{artist} - {title}" if artist else title,
+            "channel": album or artist,
+            "duration": text,
+            "url": path,
+            "thumbnail": "",
+            "source": "local",
+        }
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """Prefix match every typed word against title, artist and album"""
+        tokens = re.findall(r"\w+", text.lower())
+        if not tokens:
+            return []
+
+        cols = "f.path, f.title, f.artist, f.album, f.duration"
+        with self.lock:
+            try:
+                if self.has_fts:
+                    match = " ".join(f'"{t}"*' for t in tokens)
+                    order = "ORDER BY x.rank " if len(text.strip()) > 1 else ""
+                    rows = self.db.execute(
+                        f"SELECT {cols} FROM files_fts x "
+                        "JOIN files f ON f.rowid = x.rowid "
+                        f"WHERE files_fts MATCH ? {order}LIMIT ?",
+                        (match, limit),
+                    ).fetchall()
+                else:
+                    where = " AND ".join(
+                        "(f.title || ' ' || f.artist || ' ' || f.album) LIKE ?"
+                        for _ in tokens
+                    )
+                    rows = self.db.execute(
+                        f"SELECT {cols} FROM files f WHERE {where} LIMIT ?",
+                        [f"%{t}%" for t in tokens] + [limit],
+                    ).fetchall()
+            except sqlite3.Error:
+                return []
+        return [self.as_result(row) for row in rows]
+
+
+def is_local(video: Dict) -> bool:
+    return str(video.get("id", "")).startswith("local:")
+
+
+def library_roots(args: argparse.Namespace) -> List[str]:
+    """Directories from --library, else $YAAP_LIBRARY (os.pathsep separated)"""
+    if getattr(args, "library", None):
+        return args.library
+    return [p for p in os.environ.get("YAAP_LIBRARY", "").split(os.pathsep) if p]
+
+
+def cache_file_name(key: str, suffix: str = "") -> str:
+    """Filesystem-safe cache file name for an arbitrary key"""
+    safe = re.sub(r"[^\w-]", "_", key)[:64]
+    if safe != key:
+        safe += "-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+    return safe + suffix
+
+
+class StreamResolver:
+    """Resolve and cache direct media URLs so mpv can skip its ytdl_hook"""
+
+    def __init__(
+        self,
+        cache_file: Optional[str] = None,
+        resolve_fn=None,
+        min_ttl: float = 600,
+        default_ttl: float = 3600,
+        http: Optional[HTTPPool] = None,
+        probe_timeout: float = 3.0,
+    ):
+        self.http = http
+        self.probe_timeout = probe_timeout
+        self.cache_file = cache_file
+        self.resolve_fn = resolve_fn or self.resolve_with_ytdlp
+        self.min_ttl = min_ttl
+        self.default_ttl = default_ttl
+        self.entries: Dict[str, Dict] = {}
+        self.pending: set = set()
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def cache_key(video_id: str, fmt: str) -> str:
+        return f"{video_id}|{fmt}"
+
+    @staticmethod
+    def parse_expiry(url: str) -> Optional[float]:
+        """Read the expiry timestamp embedded in a googlevideo URL"""
+        try:
+            parsed = urllib.parse.urlparse(url)
+            expire = urllib.parse.parse_qs(parsed.query).get("expire")
+            if expire:
+                return float(expire[0])
+            match = re.search(r"/expire/(\d+)", parsed.path)
+            if match:
+                return float(match.group(1))
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def ytdlp_cmd(page_url: str, fmt: str) -> List[str]:
+        return [
+            "yt-dlp",
+            "--dump-json",
+            "--no-playlist",
+            "--no-warnings",
+            "-f",
+            fmt,
+            page_url,
+        ]
+
+    @staticmethod
+    def parse_ytdlp_info(output: str) -> Optional[Dict]:
+        info = json.loads(output)
+        url = info.get("url")
+        if not url:
+            return None
+        return {"url": url, "headers": info.get("http_headers") or {}}
+
+    def resolve_with_ytdlp(self, page_url: str, fmt: str) -> Optional[Dict]:
+        """Run yt-dlp once to get the direct URL and request headers"""
+        result = subprocess.run(
+            self.ytdlp_cmd(page_url, fmt), capture_output=True, text=True, timeout=30
+        )
+        if result.returncode != 0:
+            return None
+        return self.parse_ytdlp_info(result.stdout)
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                self.entries = json.load(f)
+        except Exception:
+            self.entries = {}
+
+    def save(self):
+        if not self.cache_file:
+            return
+        now = time.time()
+        with self.lock:
+            entries = {
+                k: v for k, v in self.entries.items() if v["expires"] > now
+            }
+            self.entries = entries
+        try:
+            # Called from resolver, warmer and UI threads at once
+            write_json_atomic(self.cache_file, entries)
+        except Exception:
+            pass
+
+    def lookup(self, video_id: str, fmt: str) -> Optional[Dict]:
+        """Cached entry that is still valid for at least min_ttl seconds"""
+        with self.lock:
+            entry = self.entries.get(self.cache_key(video_id, fmt))
+        if entry and entry["expires"] - time.time() > self.min_ttl:
+            return entry
+        return None
+
+    def invalidate(self, video_id: str, fmt: str):
+        with self.lock:
+            dropped = self.entries.pop(self.cache_key(video_id, fmt), None)
+        if dropped is not None:
+            self.save()
+
+    def resolve(
+        self, video_id: str, page_url: str, fmt: str, resolve_fn=None
+    ) -> Optional[Dict]:
+        """Resolve now (optionally with another resolve_fn) and store the result"""
+        try:
+            resolved = (resolve_fn or self.resolve_fn)(page_url, fmt)
+        except Exception:
+            resolved = None
+        if not resolved:
+            return None
+
+        now = time.time()
+        expires = self.parse_expiry(resolved["url"]) or now + self.default_ttl
+        entry = {
+            "url": resolved["url"],
+            "headers": resolved.get("headers") or {},
+            "expires": expires,
+            "resolved_at": now,
+        }
+        with self.lock:
+            self.entries[self.cache_key(video_id, fmt)] = entry
+        self.save()
+        return entry
+
+    def resolve_async(self, video_id: str, page_url: str, fmt: str):
+        """Resolve in the background unless already cached or in flight"""
+        key = self.cache_key(video_id, fmt)
+        with self.lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+
+        def worker():
+            try:
+                if self.lookup(video_id, fmt) is None:
+                    self.resolve(video_id, page_url, fmt)
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def probe(self, entry: Dict) -> bool:
+        """Check the CDN still accepts the URL (a 403 means it went stale)"""
+        headers = dict(entry.get("headers") or {})
+        headers["Range"] = "bytes=0-0"
+        try:
+            if self.http is not None:
+                # Runs on the UI thread before mpv starts: keep it short
+                status, _, _ = self.http.request(
+                    "GET", entry["url"], headers, timeout=self.probe_timeout
+                )
+                return status not in (403, 404, 410)
+            req = urllib.request.Request(entry["url"], headers=headers)
+            with urllib.request.urlopen(req, timeout=self.probe_timeout):
+                return True
+        except urllib.error.HTTPError as e:
+            return e.code not in (403, 404, 410)
+        except Exception:
+            return True
+
+    def playable_url(
+        self, video_id: str, page_url: str, fmt: str
+    ) -> Tuple[str, Optional[Dict]]:
+        """Direct URL and headers if cached, else the page URL for ytdl_hook"""
+        entry = self.lookup(video_id, fmt)
+        if entry is not None and self.probe(entry):
+            return entry["url"], entry.get("headers") or {}
+
+        if entry is not None:
+            self.invalidate(video_id, fmt)
+        self.resolve_async(video_id, page_url, fmt)
+        return page_url, None
+
+
+# Format selectors and mpv cache settings per quality profile. min_audio /
+# min_video are the measured throughputs (bytes/s) auto mode needs to pick
+# the profile.
+QUALITY_PROFILES = {
+    "low": {
+        "audio": "bestaudio[abr<=64]/worstaudio/worst",
+        "video": "best[height<=360]/worst",
+        "cache": [
+            "--demuxer-readahead-secs=5",
+            "--demuxer-max-bytes=8MiB",
+            "--demuxer-max-back-bytes=4MiB",
+        ],
+        "min_audio": 0,
+        "min_video": 0,
+    },
+    "normal": {
+        "audio": "bestaudio[abr<=160]/bestaudio/best",
+        "video": "best[height<=720]/best",
+        "cache": [
+            "--demuxer-readahead-secs=20",
+            "--demuxer-max-bytes=50MiB",
+            "--demuxer-max-back-bytes=25MiB",
+        ],
+        "min_audio": 64 * 1024,
+        "min_video": 1024 * 1024,
+    },
+    "best": {
+        "audio": "bestaudio/best",
+        "video": "best",
+        "cache": [
+            "--demuxer-readahead-secs=60",
+            "--demuxer-max-bytes=150MiB",
+            "--demuxer-max-back-bytes=75MiB",
+        ],
+        "min_audio": 256 * 1024,
+        "min_video": 4 * 1024 * 1024,
+    },
+}
+
+
+class ThroughputEstimate:
+    """Moving average of measured stream throughput, kept across sessions"""
+
+    def __init__(self, stats_file: Optional[str] = None, weight: float = 0.3):
+        self.stats_file = stats_file
+        self.weight = weight
+        self.bytes_per_s: Optional[float] = None
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file) as f:
+                self.bytes_per_s = json.load(f).get("bytes_per_s")
+        except Exception:
+            self.bytes_per_s = None
+
+    def save(self):
+        if not self.stats_file:
+            return
+        try:
+            tmp = self.stats_file + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"bytes_per_s": self.bytes_per_s}, f)
+            os.replace(tmp, self.stats_file)
+        except Exception:
+            pass
+
+    def add(self, bytes_per_s: float):
+        with self.lock:
+            if self.bytes_per_s is None:
+                self.bytes_per_s = bytes_per_s
+            else:
+                self.bytes_per_s += self.weight * (bytes_per_s - self.bytes_per_s)
+        self.save()
+
+    def pick(self, audio_only: bool) -> str:
+        """Best profile the measured link sustains with some headroom"""
+        if self.bytes_per_s is None:
+            return "normal"
+        key = "min_audio" if audio_only else "min_video"
+        usable = self.bytes_per_s * 0.8
+        chosen = "low"
+        for name, profile in QUALITY_PROFILES.items():
+            if usable >= profile[key]:
+                chosen = name
+        return chosen
+
+
+class SearchIndex:
+    """Local SQLite FTS5 index of seen results and played tracks"""
+
+    COLUMNS = ("id", "title", "channel", "duration", "url", "thumbnail")
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.has_fts = True
+        with self.lock:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                "id TEXT PRIMARY KEY, title TEXT, channel TEXT, "
+                "duration TEXT, url TEXT, thumbnail TEXT, "
+                "plays INTEGER DEFAULT 0, last_seen REAL, last_played REAL)"
+            )
+            try:
+                # FTS rows share the tracks rowid; older indexes linked back
+                # through an unindexed track_id column, which made every
+                # delete a full scan, so rebuild those
+                columns = [
+                    row[1]
+                    for row in self.db.execute("PRAGMA table_info(tracks_fts)")
+                ]
+                if "track_id" in columns:
+                    self.db.execute("DROP TABLE tracks_fts")
+                self.db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5("
+                    "title, channel, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')"
+                )
+                if "track_id" in columns:
+                    self.db.execute(
+                        "INSERT INTO tracks_fts (rowid, title, channel) "
+                        "SELECT rowid, title, channel FROM tracks"
+                    )
+            except sqlite3.OperationalError:
+                self.has_fts = False
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, results TEXT, ts REAL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS successors ("
+                "prev_id TEXT, next_id TEXT, count INTEGER, last REAL, "
+                "PRIMARY KEY (prev_id, next_id))"
+            )
+            self.db.commit()
+
+    def add_results(self, results: List[Dict]):
+        """Upsert search results, touching the FTS table only for new titles"""
+        now = time.time()
+        with self.lock:
+            for r in results:
+                if not r.get("id"):
+                    continue
+                row = self.db.execute(
+                    "SELECT rowid, title, channel FROM tracks WHERE id = ?",
+                    (r["id"],),
+                ).fetchone()
+                values = [r.get(c, "") for c in self.COLUMNS]
+                if row is None:
+                    rowid = self.db.execute(
+                        "INSERT INTO tracks (id, title, channel, duration, url, "
+                        "thumbnail, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        values + [now],
+                    ).lastrowid
+                else:
+                    rowid = row[0]
+                    self.db.execute(
+                        "UPDATE tracks SET title = ?, channel = ?, duration = ?, "
+                        "url = ?, thumbnail = ?, last_seen = ? WHERE id = ?",
+                        values[1:] + [now, r["id"]],
+                    )
+                text = (r.get("title", ""), r.get("channel", ""))
+                if self.has_fts and (row is None or row[1:] != text):
+                    if row is not None:
+                        self.db.execute(
+                            "DELETE FROM tracks_fts WHERE rowid = ?", (rowid,)
+                        )
+                    self.db.execute(
+                        "INSERT INTO tracks_fts (rowid, title, channel) "
+                        "VALUES (?, ?, ?)",
+                        (rowid,) + text,
+                    )
+            self.db.commit()
+
+    def mark_played(self, video: Dict):
+        """Count a play and link it to the previously played track"""
+        self.add_results([video])
+        now = time.time()
+        with self.lock:
+            prev = self.db.execute(
+                "SELECT id FROM tracks WHERE last_played IS NOT NULL "
+                "ORDER BY last_played DESC LIMIT 1"
+            ).fetchone()
+            if prev is not None and prev[0] != video.get("id"):
+                self.db.execute(
+                    "INSERT INTO successors (prev_id, next_id, count, last) "
+                    "VALUES (?, ?, 1, ?) ON CONFLICT (prev_id, next_id) "
+                    "DO UPDATE SET count = count + 1, last = excluded.last",
+                    (prev[0], video.get("id"), now),
+                )
+            self.db.execute(
+                "UPDATE tracks SET plays = plays + 1, last_played = ? "
+                "WHERE id = ?",
+                (now, video.get("id")),
+            )
+            self.db.commit()
+
+    def predict(
+        self, current_id: Optional[str], limit: int = 5, half_life: float = 7 * 86400
+    ) -> List[Dict]:
+        """Tracks likely to be played next: usual successors of the current
+        one, then play counts decayed by recency"""
+        cols = ", ".join(f"t.{c}" for c in self.COLUMNS)
+        with self.lock:
+            following = []
+            if current_id:
+                following = self.db.execute(
+                    f"SELECT {cols} FROM successors s "
+                    "JOIN tracks t ON t.id = s.next_id WHERE s.prev_id = ? "
+                    "ORDER BY s.count DESC, s.last DESC LIMIT ?",
+                    (current_id, limit),
+                ).fetchall()
+            played = self.db.execute(
+                f"SELECT {cols}, t.plays, t.last_played FROM tracks t "
+                "WHERE t.plays > 0 ORDER BY t.last_played DESC LIMIT 200"
+            ).fetchall()
+
+        now = time.time()
+        played.sort(key=lambda row: -row[-2] * 0.5 ** ((now - row[-1]) / half_life))
+        picks = [dict(zip(self.COLUMNS, row)) for row in following]
+        seen = {v["id"] for v in picks}
+        for row in played:
+            if len(picks) >= limit:
+                break
+            if row[0] not in seen and row[0] != current_id:
+                seen.add(row[0])
+                picks.append(dict(zip(self.COLUMNS, row[:-2])))
+        return picks[:limit]
+
+    @staticmethod
+    def cache_key(source: str, query: str) -> str:
+        return f"{source}:{' '.join(query.lower().split())}"
+
+    def cached_search(
+        self, source: str, query: str, max_age: float = 6 * 3600
+    ) -> Optional[List[Dict]]:
+        """Results of an earlier network search, if recent enough"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT results, ts FROM search_cache WHERE key = ?",
+                (self.cache_key(source, query),),
+            ).fetchone()
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def store_search(self, source: str, query: str, results: List[Dict]):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, results, ts) "
+                "VALUES (?, ?, ?)",
+                (self.cache_key(source, query), json.dumps(results), time.time()),
+            )
+            self.db.commit()
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """Prefix match every typed word; played tracks rank first"""
+        tokens = re.findall(r"\w+", text.lower())
+        if not tokens:
+            return []
+
+        cols = ", ".join(f"t.{c}" for c in self.COLUMNS) + ", t.plays"
+        with self.lock:
+            try:
+                if self.has_fts:
+                    match = " ".join(f'"{t}"*' for t in tokens)
+                    # Ranking a one-letter prefix means scoring most of the
+                    # table; the first hits are good enough at that point
+                    order = "ORDER BY f.rank " if len(text.strip()) > 1 else ""
+                    rows = self.db.execute(
+                        f"SELECT {cols} FROM tracks_fts f "
+                        "JOIN tracks t ON t.rowid = f.rowid "
+                        f"WHERE tracks_fts MATCH ? {order}LIMIT ?",
+                        (match, limit * 3),
+                    ).fetchall()
+                else:
+                    where = " AND ".join("t.title LIKE ?" for _ in tokens)
+                    rows = self.db.execute(
+                        f"SELECT {cols} FROM tracks t WHERE {where} LIMIT ?",
+                        [f"%{t}%" for t in tokens] + [limit * 3],
+                    ).fetchall()
+            except sqlite3.Error:
+                return []
+
+        rows.sort(key=lambda row: -row[-1])
+        return [dict(zip(self.COLUMNS, row[:-1])) for row in rows[:limit]]
+
+
+class SearchStrategy:
+    """One way of running a search: command builder, parser and timeout"""
+
+    def __init__(self, name: str, build_cmd, parse, timeout: float):
+        self.name = name
+        self.build_cmd = build_cmd
+        self.parse = parse
+        self.timeout = timeout
+
+
+class HedgedSearch:
+    """Run the primary strategy, hedge with the fallback if it is slow.
+
+    Whichever strategy returns usable results first wins and the other
+    process is killed. Latencies of successful runs are kept per strategy
+    and, unless a fixed delay is given, the hedge delay tracks the p90 of
+    the primary's recent latencies. A primary that loses to the fallback
+    is recorded at the time it had run so far, a lower bound, so slow runs
+    are not dropped from the p90 and the delay does not ratchet down.
+    """
+
+    def __init__(
+        self,
+        primary: SearchStrategy,
+        fallback: SearchStrategy,
+        hedge_delay: Optional[float] = None,
+        stats_file: Optional[str] = None,
+        initial_delay: float = 4.0,
+        min_delay: float = 0.5,
+        max_delay: float = 15.0,
+        tracer: Optional[Tracer] = None,
+    ):
+        self.tracer = tracer
+        self.primary = primary
+        self.fallback = fallback
+        self.fixed_delay = hedge_delay
+        self.stats_file = stats_file
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latencies: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file) as f:
+                self.latencies = json.load(f)
+        except Exception:
+            self.latencies = {}
+
+    def save(self):
+        if not self.stats_file:
+            return
+        with self.lock:
+            latencies = {k: list(v) for k, v in self.latencies.items()}
+        try:
+            write_json_atomic(self.stats_file, latencies)
+        except Exception:
+            pass
+
+    def record(self, name: str, seconds: float):
+        with self.lock:
+            samples = self.latencies.setdefault(name, [])
+            samples.append(round(seconds, 3))
+            del samples[:-50]
+        self.save()
+
+    def hedge_delay(self) -> float:
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        with self.lock:
+            samples = sorted(self.latencies.get(self.primary.name, []))
+        if len(samples) < 5:
+            return self.initial_delay
+        # Nearest-rank p90
+        p90 = samples[min(len(samples) - 1, math.ceil(0.9 * len(samples)) - 1)]
+        return max(self.min_delay, min(self.max_delay, p90))
+
+    def run(self, query: str) -> List[Dict]:
+        outcomes: "queue.Queue" = queue.Queue()
+        procs: Dict[str, subprocess.Popen] = {}
+        done = threading.Event()
+
+        def attempt(strategy: SearchStrategy):
+            started = time.monotonic()
+            results = None
+            try:
+                proc = subprocess.Popen(
+                    strategy.build_cmd(query),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                )
+                procs[strategy.name] = proc
+                if done.is_set():
+                    proc.kill()
+                try:
+                    out, _ = proc.communicate(timeout=strategy.timeout)
+                    if self.tracer is not None:
+                        self.tracer.record(
+                            f"search.{strategy.name}.yt-dlp",
+                            time.monotonic() - started,
+                        )
+                        with self.tracer.span(f"search.{strategy.name}.parse"):
+                            results = strategy.parse(out) or None
+                    else:
+                        results = strategy.parse(out) or None
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.communicate()
+            except Exception:
+                results = None
+            outcomes.put((strategy, results, time.monotonic() - started))
+
+        def launch(strategy: SearchStrategy):
+            threading.Thread(target=attempt, args=(strategy,), daemon=True).start()
+
+        primary_started = time.monotonic()
+        launch(self.primary)
+        hedge_at = primary_started + self.hedge_delay()
+        hedged = False
+        primary_done = False
+        pending = 1
+
+        try:
+            while pending:
+                timeout = None if hedged else max(0, hedge_at - time.monotonic())
+                try:
+                    strategy, results, elapsed = outcomes.get(timeout=timeout)
+                except queue.Empty:
+                    launch(self.fallback)
+                    hedged = True
+                    pending += 1
+                    continue
+
+                pending -= 1
+                primary_done = primary_done or strategy is self.primary
+                if results:
+                    self.record(strategy.name, elapsed)
+                    if not primary_done:
+                        self.record(
+                            self.primary.name, time.monotonic() - primary_started
+                        )
+                    return results
+                if not hedged:
+                    launch(self.fallback)
+                    hedged = True
+                    pending += 1
+            return []
+        finally:
+            done.set()
+            for proc in list(procs.values()):
+                if proc.poll() is None:
+                    try:
+                        proc.kill()
+                    except Exception:
+                        pass
+
+
+class SearchProvider:
+    """A named search backend with its own deadline"""
+
+    def __init__(self, name: str, search_fn, deadline: float):
+        self.name = name
+        self.search_fn = search_fn
+        self.deadline = deadline
+
+    def search(self, query: str) -> List[Dict]:
+        return self.search_fn(query)
+
+
+class FanOutSearch:
+    """Query several providers at once and merge results as they arrive"""
+
+    def __init__(self, providers: List[SearchProvider]):
+        self.providers = providers
+
+    @staticmethod
+    def result_key(video: Dict) -> str:
+        return video.get("id") or video.get("url", "")
+
+    def run(self, query: str, on_update=None) -> List[Dict]:
+        """Return merged, deduplicated results.
+
+        on_update(merged, provider_name) is called after every provider
+        that contributed new results, so callers can show them right away.
+        Providers still running at their deadline are ignored.
+        """
+        arrivals: "queue.Queue" = queue.Queue()
+        started = time.monotonic()
+
+        def worker(provider: SearchProvider):
+            try:
+                results = provider.search(query)
+            except Exception:
+                results = []
+            arrivals.put((provider, results))
+
+        for provider in self.providers:
+            threading.Thread(
+                target=worker,
+                args=(provider,),
+                name=f"search-{provider.name}",
+                daemon=True,
+            ).start()
+
+        deadlines = {p.name: started + p.deadline for p in self.providers}
+        merged: List[Dict] = []
+        seen: set = set()
+
+        while deadlines:
+            timeout = max(0, min(deadlines.values()) - time.monotonic())
+            try:
+                provider, results = arrivals.get(timeout=timeout)
+            except queue.Empty:
+                now = time.monotonic()
+                deadlines = {n: d for n, d in deadlines.items() if d > now}
+                continue
+
+            if deadlines.pop(provider.name, None) is None:
+                continue
+
+            added = False
+            for video in results or []:
+                key = self.result_key(video)
+                if key and key not in seen:
+                    seen.add(key)
+                    merged.append(video)
+                    added = True
+            if added and on_update is not None:
+                on_update(list(merged), provider.name)
+
+        return merged
+
+
+class PlaybackSession:
+    """Threads and subprocesses that belong to one played track.
+
+    Each play gets a new session with its own generation id and stop
+    event; stopping it terminates its processes and joins its threads,
+    so rapid skipping cannot leave old pollers or cava instances behind.
+    """
+
+    _generations = itertools.count(1)
+
+    def __init__(self):
+        self.generation = next(self._generations)
+        self.started_at = time.perf_counter()
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+        self.processes: List[subprocess.Popen] = []
+        self.lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return not self.stop_event.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep until the session stops; True if it did"""
+        return self.stop_event.wait(seconds)
+
+    def spawn(self, target, name: str) -> threading.Thread:
+        thread = threading.Thread(
+            target=target,
+            args=(self,),
+            name=f"{name}-{self.generation}",
+            daemon=True,
+        )
+        with self.lock:
+            # Short-lived workers (one per seek) would pile up otherwise
+            self.threads = [t for t in self.threads if t.is_alive()]
+            self.threads.append(thread)
+        thread.start()
+        return thread
+
+    def add_process(self, process: subprocess.Popen):
+        with self.lock:
+            self.processes.append(process)
+            stopped = not self.active
+        if stopped:
+            self.terminate(process)
+
+    @staticmethod
+    def terminate(process: subprocess.Popen, timeout: float = 2.0):
+        if process.poll() is not None:
+            return
+        try:
+            process.terminate()
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        except Exception:
+            pass
+
+    def stop(self, timeout: float = 2.0):
+        self.stop_event.set()
+        with self.lock:
+            processes = list(self.processes)
+            threads = list(self.threads)
+        for process in processes:
+            self.terminate(process, timeout)
+        current = threading.current_thread()
+        for thread in threads:
+            if thread is not current:
+                thread.join(timeout)
+
+
+class CacheWarmer:
+    """Idle-time prefetching for the tracks most likely to be played next.
+
+    Candidates are the highlighted result, the track after the current
+    one and the play history's predictions. For each, the stream URL is
+    resolved, lyrics and thumbnail are cached and, with a prebuffer, the
+    first seconds of audio are range-fetched so the URL is verified and
+    the CDN edge is hot. Work starts only after `idle_delay` seconds
+    without user activity and is paced by CPU (seconds per second) and
+    bandwidth (bytes per second) token buckets. Thumbnail/lyrics writes
+    stop once those caches exceed `disk_budget` bytes. A step in flight
+    is abandoned as soon as the user does something.
+
+    The bandwidth bucket only sees traffic through the HTTP pool. Stream
+    resolution runs in yt-dlp, whose few KB of page/API requests aren't
+    visible here; it is paced by the CPU bucket instead, runs niced and
+    is killed on user activity.
+    """
+
+    STEPS = ("stream", "lyrics", "thumbnail", "prebuffer")
+
+    def __init__(
+        self,
+        player: "YouTubeTUI",
+        idle_delay: float = 3.0,
+        cpu_share: float = 0.1,
+        bandwidth: float = 256 * 1024,
+        disk_budget: int = 200 * 1024 * 1024,
+        prebuffer_seconds: float = 0.0,
+        candidates: int = 5,
+    ):
+        self.player = player
+        self.idle_delay = idle_delay
+        # CPU is metered in milliseconds so the burst stays at 200 ms
+        self.cpu = RateLimiter(cpu_share * 1000, burst=200)
+        self.bandwidth = RateLimiter(bandwidth, burst=int(bandwidth * 2))
+        self.disk_budget = disk_budget
+        self.prebuffer_seconds = prebuffer_seconds
+        self.limit = candidates
+        self.done: "collections.OrderedDict[tuple, bool]" = collections.OrderedDict()
+        self.stats = collections.Counter()
+        self.cpu_seconds = 0.0
+        self.child_cpu = 0.0
+        self.disk_checked = (0.0, 0)
+        self.busy = False
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run, name="cache-warmer", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def idle(self) -> bool:
+        player = self.player
+        return (
+            not player.searching
+            and time.monotonic() - player.last_activity >= self.idle_delay
+        )
+
+    def interrupted(self, since: float) -> bool:
+        return (
+            self.stop_event.is_set()
+            or self.player.last_activity > since
+            or self.player.searching
+        )
+
+    def cpu_clock(self) -> float:
+        """CPU seconds of this thread plus the yt-dlp processes it reaped.
+
+        RUSAGE_CHILDREN would also charge mpv or any other child the
+        player happens to reap meanwhile, so resolve_niced collects its
+        own child's usage with wait4. A jp2a conversion is a few ms and
+        is not metered.
+        """
+        return time.thread_time() + self.child_cpu
+
+    def disk_used(self) -> int:
+        checked_at, used = self.disk_checked
+        if time.monotonic() - checked_at < 30:
+            return used
+        used = 0
+        for folder in (cache_dir("thumbs"), cache_dir("lyrics")):
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        used += entry.stat().st_size
+                    except OSError:
+                        continue
+        self.disk_checked = (time.monotonic(), used)
+        return used
+
+    def candidates(self) -> List[Dict]:
+        player = self.player
+        picks: List[Dict] = []
+        results = list(player.results)
+        if results:
+            picks.append(results[player.selected_index % len(results)])
+            if player.current_video in results:
+                after = results.index(player.current_video) + 1
+                picks.append(results[after % len(results)])
+        current_id = (player.current_video or {}).get("id")
+        picks.extend(player.index.predict(current_id, self.limit))
+
+        seen, out = set(), []
+        for video in picks:
+            vid = video.get("id")
+            if not vid or vid in seen or is_local(video):
+                continue
+            if player.playing and vid == current_id:
+                continue
+            seen.add(vid)
+            out.append(video)
+        return out[: self.limit]
+
+    def next_step(self) -> Optional[Tuple[str, Dict, tuple]]:
+        fmt = self.player.stream_format()
+        for video in self.candidates():
+            for step in self.STEPS:
+                if step == "prebuffer" and not self.prebuffer_seconds:
+                    continue
+                key = (step, video["id"], fmt if step in ("stream", "prebuffer") else "")
+                if key not in self.done:
+                    return step, video, key
+        return None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if not self.idle():
+                self.stop_event.wait(0.25)
+                continue
+            try:
+                planned = self.next_step()
+            except Exception:
+                planned = None
+            if planned is None:
+                self.stop_event.wait(2)
+                continue
+
+            step, video, key = planned
+            self.done[key] = True
+            while len(self.done) > 1000:
+                self.done.popitem(last=False)
+
+            started = time.monotonic()
+            cpu_before = self.cpu_clock()
+            bytes_before = self.player.http.thread_bytes()
+            self.busy = True
+            try:
+                with self.player.tracer.span(f"warm.{step}"):
+                    completed = getattr(self, "warm_" + step)(video, started)
+            except Exception:
+                completed = False
+            finally:
+                self.busy = False
+
+            if completed:
+                self.stats[step] += 1
+            elif self.interrupted(started):
+                # Yielded to the user; try again at the next idle period
+                self.done.pop(key, None)
+                self.stats["yielded"] += 1
+
+            cost = max(0.0, self.cpu_clock() - cpu_before)
+            # Only this thread's requests: foreground fetches aren't charged
+            used = self.player.http.thread_bytes() - bytes_before
+            self.cpu_seconds += cost
+            self.stats["bytes"] += used
+            wait = self.cpu.reserve(cost * 1000)
+            if step != "prebuffer":
+                # Prebuffer chunks reserve bandwidth before fetching
+                wait = max(wait, self.bandwidth.reserve(used))
+            self.stop_event.wait(wait)
+
+    def resolve_niced(self, page_url: str, fmt: str, started: float) -> Optional[Dict]:
+        """yt-dlp at low priority, killed the moment the user is active"""
+        cmd = StreamResolver.ytdlp_cmd(page_url, fmt)
+        if shutil.which("nice"):
+            cmd = ["nice", "-n", "10"] + cmd
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        output: List[str] = []
+        reader = threading.Thread(
+            target=lambda: output.append(proc.stdout.read()), daemon=True
+        )
+        reader.start()
+        deadline = time.monotonic() + 30
+        killed = False
+        # Reap with wait4 rather than communicate() to get this child's
+        # own CPU usage
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if self.interrupted(started) or time.monotonic() > deadline:
+                proc.kill()
+                killed = True
+                pid, status, usage = os.wait4(proc.pid, 0)
+                break
+            time.sleep(0.05)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        self.child_cpu += usage.ru_utime + usage.ru_stime
+        reader.join(timeout=2)
+        proc.stdout.close()
+        if killed or proc.returncode != 0 or not output:
+            return None
+        return StreamResolver.parse_ytdlp_info(output[0])
+
+    def warm_stream(self, video: Dict, started: float) -> bool:
+        resolver = self.player.resolver
+        fmt = self.player.stream_format()
+        if resolver.lookup(video["id"], fmt) is not None:
+            return True
+        entry = resolver.resolve(
+            video["id"],
+            video["url"],
+            fmt,
+            resolve_fn=lambda url, f: self.resolve_niced(url, f, started),
+        )
+        return entry is not None
+
+    def warm_lyrics(self, video: Dict, started: float) -> bool:
+        if self.disk_used() > self.disk_budget:
+            return False
+        title, channel = video.get("title", ""), video.get("channel", "")
+        duration = parse_duration(video.get("duration"))
+        artist, track = split_artist_title(title, channel)
+        if self.player.lyrics_store.lookup(artist, track, duration) is None:
+            self.player.lookup_lyrics(title, channel, duration)
+        return True
+
+    def warm_thumbnail(self, video: Dict, started: float) -> bool:
+        if video["id"] in self.player.thumbnails or not video.get("thumbnail"):
+            return True
+        if self.disk_used() > self.disk_budget:
+            return False
+        self.player.download_thumbnail(video["id"], video["thumbnail"])
+        return True
+
+    def warm_prebuffer(self, video: Dict, started: float) -> bool:
+        """Range-fetch the first seconds of the resolved stream"""
+        player = self.player
+        fmt = player.stream_format()
+        entry = player.resolver.lookup(video["id"], fmt)
+        if entry is None:
+            return False
+        rate = 20 * 1024 if player.audio_only else 320 * 1024
+        total = int(self.prebuffer_seconds * rate)
+        headers = dict(entry.get("headers") or {})
+        offset, chunk = 0, 64 * 1024
+        while offset < total:
+            size = min(chunk, total - offset)
+            wait_until = time.monotonic() + self.bandwidth.reserve(size)
+            while time.monotonic() < wait_until:
+                if self.interrupted(started):
+                    return False
+                self.stop_event.wait(min(0.1, wait_until - time.monotonic()))
+            if self.interrupted(started):
+                return False
+            headers["Range"] = f"bytes={offset}-{offset + size - 1}"
+            status, _, body = player.http.request("GET", entry["url"], headers)
+            if status in (403, 404, 410):
+                player.resolver.invalidate(video["id"], fmt)
+                return False
+            if status not in (200, 206) or not body:
+                return False
+            offset += len(body)
+            if status == 200 or len(body) < size:
+                break
+        return True
+
+
+@functools.lru_cache(maxsize=16384)
+def char_width(ch: str) -> int:
+    """Terminal cells for one character: 2 for East Asian wide/fullwidth
+    (CJK, most emoji), 0 for combining marks and format characters"""
+    if ch < "\x7f":
+        return 1 if ch >= " " else 0
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ("Mn", "Me", "Cf"):
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+
+
+def text_width(text: str) -> int:
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return sum(char_width(ch) for ch in text)
+
+
+def fit_width(text: str, width: int) -> str:
+    """Longest prefix of text that fits in `width` cells"""
+    if text.isascii() and text.isprintable():
+        return text[: max(0, width)]
+    used = 0
+    for i, ch in enumerate(text):
+        w = char_width(ch)
+        if used + w > width:
+            return text[:i]
+        used += w
+    return text
+
+
+class LayoutCache:
+    """Bounded LRU of cell-width-aware truncated / centered strings.
+
+    Titles and lyric lines repeat every frame, so each (string, width)
+    is measured once. clear() on terminal resize, since every width
+    changes then.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: "collections.OrderedDict[tuple, str]" = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: tuple, build) -> str:
+        entries = self.entries
+        try:
+            value = entries[key]
+            entries.move_to_end(key)
+            self.hits += 1
+            return value
+        except KeyError:
+            pass
+        self.misses += 1
+        value = entries[key] = build()
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def fit(self, text: str, width: int) -> str:
+        """text truncated to at most `width` cells"""
+        return self.lookup(("fit", text, width), lambda: fit_width(text, width))
+
+    def center(self, text: str, width: int) -> str:
+        """text truncated and padded to exactly `width` cells, centered"""
+
+        def build() -> str:
+            clipped = fit_width(text, width)
+            pad = max(0, width - text_width(clipped))
+            return " " * (pad // 2) + clipped + " " * (pad - pad // 2)
+
+        return self.lookup(("center", text, width), build)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class CursesScreen:
+    """Screen backed by a real curses window"""
+
     def __init__(self, stdscr):
         self.stdscr = stdscr
+
+    def __getattr__(self, name):
+        return getattr(self.stdscr, name)
+
+    def setup(self):
+        """Colors, cursor, input timeout and mouse reporting"""
+        curses.start_color()
+        curses.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)
+        curses.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)
+        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        curses.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)
+        curses.init_pair(5, curses.COLOR_MAGENTA, curses.COLOR_BLACK)
+        curses.init_pair(6, curses.COLOR_WHITE, curses.COLOR_BLACK)
+
+        curses.curs_set(0)
+        self.stdscr.timeout(100)
+
+        curses.mousemask(curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION)
+
+    def color_pair(self, n: int) -> int:
+        return curses.color_pair(n)
+
+    def curs_set(self, visibility: int):
+        try:
+            curses.curs_set(visibility)
+        except curses.error:
+            pass
+
+    def getmouse(self):
+        return curses.getmouse()
+
+
+class MemoryScreen:
+    """In-memory screen for headless runs and render profiling.
+
+    Cells are recorded as characters (a wide character fills its cell
+    and leaves the next one empty); addstr calls and the bytes they
+    carry are counted, and refresh() counts the bytes of cells that
+    changed since the previous refresh, roughly what curses would emit.
+    Writes off the screen raise curses.error like a real window, and
+    writes that spill past the right edge are counted as wraps.
+    """
+
+    KEY_NAMES = {
+        "ENTER": 10,
+        "ESC": 27,
+        "SPACE": 32,
+        "BACKSPACE": 127,
+        "UP": curses.KEY_UP,
+        "DOWN": curses.KEY_DOWN,
+        "LEFT": curses.KEY_LEFT,
+        "RIGHT": curses.KEY_RIGHT,
+    }
+
+    def __init__(self, height: int = 50, width: int = 160, keys=None):
+        self.height = height
+        self.width = width
+        self.keys: List[int] = list(keys or [])
+        self.attr = 0
+        self.cells = self.blank()
+        self.shown = self.blank()
+        self.addstr_calls = 0
+        self.addstr_bytes = 0
+        self.emitted_bytes = 0
+        self.refreshes = 0
+        self.wraps = 0
+
+    @classmethod
+    def parse_keys(cls, script: str) -> List[int]:
+        """'s|some query|ENTER|@20|DOWN' -> key codes; @N idles N frames"""
+        keys: List[int] = []
+        for token in script.split("|") if script else []:
+            if token in cls.KEY_NAMES:
+                keys.append(cls.KEY_NAMES[token])
+            elif token.startswith("@") and token[1:].isdigit():
+                keys.extend([-1] * int(token[1:]))
+            else:
+                keys.extend(ord(ch) for ch in token)
+        return keys
+
+    def blank(self) -> List[List[str]]:
+        return [[" "] * self.width for _ in range(self.height)]
+
+    def setup(self):
+        pass
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def color_pair(self, n: int) -> int:
+        return n << 8
+
+    def attron(self, attr: int):
+        self.attr |= attr
+
+    def attroff(self, attr: int):
+        self.attr &= ~attr
+
+    def addstr(self, y: int, x: int, text: str, attr: int = 0):
+        self.addstr_calls += 1
+        self.addstr_bytes += len(text.encode("utf-8"))
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("addwstr() returned ERR")
+        for ch in text:
+            w = char_width(ch)
+            if w == 0:
+                if x > 0:
+                    self.cells[y][x - 1] += ch
+                continue
+            if x + w > self.width:
+                self.wraps += 1
+                y, x = y + 1, 0
+            if y >= self.height:
+                raise curses.error("addwstr() returned ERR")
+            self.cells[y][x] = ch
+            if w == 2:
+                self.cells[y][x + 1] = ""
+            x += w
+
+    def clear(self):
+        self.cells = self.blank()
+
+    erase = clear
+
+    def refresh(self):
+        self.refreshes += 1
+        for row, shown in zip(self.cells, self.shown):
+            if row != shown:
+                self.emitted_bytes += sum(
+                    len(a.encode("utf-8")) for a, b in zip(row, shown) if a != b
+                )
+        self.shown = [row[:] for row in self.cells]
+
+    def getch(self) -> int:
+        return self.keys.pop(0) if self.keys else -1
+
+    def timeout(self, delay: int):
+        pass
+
+    def curs_set(self, visibility: int):
+        pass
+
+    def getmouse(self):
+        raise curses.error("no mouse in headless mode")
+
+    def lines(self) -> List[str]:
+        return ["".join(row) for row in self.cells]
+
+
+class YouTubeTUI:
+    def __init__(self, stdscr, args: Optional[argparse.Namespace] = None):
+        if stdscr is not None and not hasattr(stdscr, "color_pair"):
+            stdscr = CursesScreen(stdscr)
+        self.stdscr = stdscr
+        self.args = args if args is not None else build_arg_parser().parse_args([])
+        self.tracer = Tracer(self.args.trace)
+        self.show_diagnostics = False
         self.search_query = ""
         self.search_input = ""
         self.results: List[Dict] = []
@@ -28,14 +2300,34 @@ class YouTubeTUI:
         self.playing = False
         self.current_video: Optional[Dict] = None
         self.mpv_process: Optional[subprocess.Popen] = None
+        self.session: Optional[PlaybackSession] = None
+        self.remote: Optional["DaemonClient"] = None
+        # (query, library hits) of the last search sent to the daemon
+        self.remote_local: Tuple[str, List[Dict]] = ("", [])
         self.cava_thread: Optional[threading.Thread] = None
         self.audio_only = True
+        self.stream_profile = ""
+        self.stream_info = ""
+        self.stream_bytes = 0.0
+        self.seek_count = 0
+        self.last_activity = time.monotonic()
+        self.layout = LayoutCache()
         self.thumbnails: Dict[str, List[str]] = {}
         self.search_mode = False
+        self.suggestions: List[Dict] = []
+        self.searching = False
+        self.search_generation = 0
         self.cava_output: List[str] = []
         self.lyrics: List[str] = []
         self.current_lyric_line = 0
+        self.lyrics_lock = threading.Lock()
+        self.lyrics_generation = 0
+        # Restored lyrics drawn before anything plays
+        self.lyrics_preview = False
         self.show_lyrics = True
+        self.session_file = os.path.join(cache_dir(), "session.json")
+        self.saved_session = ""
+        self.resume_position = 0.0
 
       
         self.mpv_socket_path: Optional[str] = None
@@ -43,22 +2335,50 @@ class YouTubeTUI:
         self.playback_duration: float = 0.0
         self.synced_lyrics: List[tuple] = [] 
         
-        curses.start_color()
-        curses.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)
-        curses.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)
-        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
-        curses.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)
-        curses.init_pair(5, curses.COLOR_MAGENTA, curses.COLOR_BLACK)
-        curses.init_pair(6, curses.COLOR_WHITE, curses.COLOR_BLACK)
-
-        curses.curs_set(0)
-        self.stdscr.timeout(100)
-
-        curses.mousemask(curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION)
+        if self.stdscr is not None:
+            self.stdscr.setup()
 
         self.has_cava = self.check_command("cava")
 
         self.thumb_dir = tempfile.mkdtemp(prefix="yaap_")
+        self.http = HTTPPool()
+        if self.args.warm_connections:
+            threading.Thread(
+                target=self.http.warm,
+                args=(["https://i.ytimg.com/", LRCLIB_URL],),
+                name="http-warm",
+                daemon=True,
+            ).start()
+        self.resolver = StreamResolver(
+            os.path.join(cache_dir(), "streams.json"), http=self.http
+        )
+        self.index = SearchIndex(os.path.join(cache_dir(), "index.db"))
+        self.throughput = ThroughputEstimate(
+            os.path.join(cache_dir(), "throughput.json")
+        )
+        self.lyrics_store = LyricsStore(os.path.join(cache_dir(), "lyrics.db"))
+        self.library = MusicLibrary(os.path.join(cache_dir(), "library.db"))
+        roots = library_roots(self.args)
+        if roots:
+            threading.Thread(
+                target=self.library.scan,
+                args=(roots,),
+                name="library-scan",
+                daemon=True,
+            ).start()
+        self.hedged_search = HedgedSearch(
+            SearchStrategy(
+                "json", self.fast_search_cmd, self.parse_fast_search, 25
+            ),
+            SearchStrategy(
+                "text", self.fallback_search_cmd, self.parse_fallback_search, 20
+            ),
+            hedge_delay=self.args.hedge_delay,
+            stats_file=os.path.join(cache_dir(), "search_latency.json"),
+            tracer=self.tracer,
+        )
+        self.fanout = FanOutSearch(self.build_providers(self.args.providers))
+        self.warmer = CacheWarmer(self, prebuffer_seconds=self.args.prebuffer)
 
     def check_command(self, cmd):
         """Check if a command exists"""
@@ -72,20 +2392,33 @@ class YouTubeTUI:
         """Download and convert thumbnail to ASCII"""
         if video_id in self.thumbnails:
             return
+        cached = self.load_ascii_thumbnail(video_id)
+        if cached is not None:
+            self.thumbnails[video_id] = cached
+            return
 
         try:
-            thumb_path = os.path.join(self.thumb_dir, f"{video_id}.jpg")
-            urllib.request.urlretrieve(thumb_url, thumb_path)
+            thumb_path = os.path.join(
+                cache_dir("thumbs"), cache_file_name(video_id, ".jpg")
+            )
+            with self.tracer.span("thumbnail.fetch"):
+                data = self.http.fetch_cached(
+                    thumb_url, thumb_path, max_age=30 * 86400
+                )
+            if data is None:
+                raise OSError("thumbnail unavailable")
 
             try:
-                result = subprocess.run(
-                    ["jp2a", "--width=40", "--height=20", thumb_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=2,
-                )
+                with self.tracer.span("thumbnail.jp2a"):
+                    result = subprocess.run(
+                        ["jp2a", "--width=40", "--height=20", thumb_path],
+                        capture_output=True,
+                        text=True,
+                        timeout=2,
+                    )
                 if result.returncode == 0:
                     self.thumbnails[video_id] = result.stdout.split("\n")
+                    self.save_ascii_thumbnail(video_id, result.stdout)
                 else:
                     self.thumbnails[video_id] = self.get_placeholder_thumb()
             except Exception:
@@ -94,6 +2427,27 @@ class YouTubeTUI:
         except Exception:
             self.thumbnails[video_id] = self.get_placeholder_thumb()
 
+    @staticmethod
+    def ascii_thumbnail_path(video_id: str) -> str:
+        return os.path.join(cache_dir("thumbs"), cache_file_name(video_id, ".txt"))
+
+    def load_ascii_thumbnail(self, video_id: str) -> Optional[List[str]]:
+        """jp2a output saved by an earlier run, if any"""
+        try:
+            with open(self.ascii_thumbnail_path(video_id)) as f:
+                return f.read().split("\n")
+        except OSError:
+            return None
+
+    def save_ascii_thumbnail(self, video_id: str, text: str):
+        path = self.ascii_thumbnail_path(video_id)
+        try:
+            with open(path + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
     def get_placeholder_thumb(self):
         """Get placeholder thumbnail"""
         return [
@@ -109,9 +2463,9 @@ class YouTubeTUI:
         """Draw the application header"""
         height, width = self.stdscr.getmaxyx()
         title = "♪ Yet Another Audio Player ♪"
-        self.stdscr.attron(curses.color_pair(1) | curses.A_BOLD)
+        self.stdscr.attron(self.stdscr.color_pair(1) | curses.A_BOLD)
         self.stdscr.addstr(0, max(0, (width - len(title)) // 2), title)
-        self.stdscr.attroff(curses.color_pair(1) | curses.A_BOLD)
+        self.stdscr.attroff(self.stdscr.color_pair(1) | curses.A_BOLD)
 
         mode = "AUDIO" if self.audio_only else "VIDEO"
         lyrics_status = "LYRICS:ON" if self.show_lyrics else "LYRICS:OFF"
@@ -119,15 +2473,15 @@ class YouTubeTUI:
         status = f"Mode: {mode} | {lyrics_status}"
         if len(status) + 2 < width:
             self.stdscr.addstr(
-                1, width - len(status) - 2, status, curses.color_pair(3)
+                1, width - len(status) - 2, status, self.stdscr.color_pair(3)
             )
 
     def draw_search_box(self):
         """Draw the search input box"""
         height, width = self.stdscr.getmaxyx()
-        self.stdscr.attron(curses.color_pair(2) | curses.A_BOLD)
+        self.stdscr.attron(self.stdscr.color_pair(2) | curses.A_BOLD)
         self.stdscr.addstr(3, 2, "Search: ")
-        self.stdscr.attroff(curses.color_pair(2) | curses.A_BOLD)
+        self.stdscr.attroff(self.stdscr.color_pair(2) | curses.A_BOLD)
 
         if self.search_mode:
             display_text = self.search_input + "█"
@@ -136,7 +2490,7 @@ class YouTubeTUI:
                 3,
                 11,
                 display_text[: width - 13],
-                curses.color_pair(3) | curses.A_BOLD,
+                self.stdscr.color_pair(3) | curses.A_BOLD,
             )
         else:
             display_query = (
@@ -146,7 +2500,7 @@ class YouTubeTUI:
             )
             self.stdscr.addstr(3, 11, " " * (width - 13))
             self.stdscr.addstr(
-                3, 11, display_query[: width - 13], curses.color_pair(6)
+                3, 11, display_query[: width - 13], self.stdscr.color_pair(6)
             )
 
     def draw_thumbnail(self, y_start, x_start, video_id):
@@ -169,7 +2523,7 @@ class YouTubeTUI:
                         y_start + i,
                         x_start,
                         line[: max(0, width - x_start - 1)],
-                        curses.color_pair(1),
+                        self.stdscr.color_pair(1),
                     )
         except Exception:
             pass
@@ -183,87 +2537,98 @@ class YouTubeTUI:
         else:
             results_width = width - 4
 
-        if not self.results:
-            if self.search_query:
+        results = self.results
+        label = "results"
+        selected = self.selected_index
+        if self.search_mode and self.suggestions:
+            results, label, selected = self.suggestions, "local matches", -1
+
+        if not results:
+            if self.searching:
                 self.stdscr.addstr(
-                    6, 2, "no results found.", curses.color_pair(4)
+                    6, 2, "Searching...", self.stdscr.color_pair(3)
+                )
+            elif self.search_query:
+                self.stdscr.addstr(
+                    6, 2, "no results found.", self.stdscr.color_pair(4)
                 )
             else:
                 self.stdscr.addstr(
-                    6, 2, "search for music or videos", curses.color_pair(6)
+                    6, 2, "search for music or videos", self.stdscr.color_pair(6)
                 )
             return
 
-        self.stdscr.attron(curses.color_pair(2) | curses.A_BOLD)
-        self.stdscr.addstr(5, 2, f"results ({len(self.results)}):")
-        self.stdscr.attroff(curses.color_pair(2) | curses.A_BOLD)
+        self.stdscr.attron(self.stdscr.color_pair(2) | curses.A_BOLD)
+        searching = " searching..." if self.searching else ""
+        self.stdscr.addstr(5, 2, f"{label} ({len(results)}):{searching}")
+        self.stdscr.attroff(self.stdscr.color_pair(2) | curses.A_BOLD)
 
         available_height = height - 8
         results_per_page = max(1, available_height // 8)
 
-        start_idx = max(0, self.selected_index - results_per_page + 1)
-        end_idx = min(len(self.results), start_idx + results_per_page)
+        start_idx = max(0, selected - results_per_page + 1)
+        end_idx = min(len(results), start_idx + results_per_page)
 
         y_pos = 7
         for i in range(start_idx, end_idx):
             if y_pos >= height - 2:
                 break
 
-            result = self.results[i]
-            is_selected = i == self.selected_index
+            result = results[i]
+            is_selected = i == selected
 
             self.draw_thumbnail(y_pos, 3, result.get("id", ""))
 
             prefix = "▶ " if is_selected else "  "
-            title = result.get("title", "Unknown")[
-                : max(0, results_width - 50)
-            ]
+            title = self.layout.fit(
+                f"{prefix}{result.get('title', 'Unknown')}",
+                max(0, results_width - 48),
+            )
             duration = result.get("duration", "N/A")
-            channel = result.get("channel", "Unknown")[:30]
+            channel = self.layout.fit(result.get("channel", "Unknown"), 30)
 
             title_x = 48
 
             if title_x < width:
                 if is_selected:
                     self.stdscr.attron(
-                        curses.color_pair(5)
+                        self.stdscr.color_pair(5)
                         | curses.A_REVERSE
                         | curses.A_BOLD
                     )
-                    self.stdscr.addstr(
-                        y_pos,
-                        title_x,
-                        f"{prefix}{title}"[: max(0, results_width - 46)],
-                    )
+                    self.stdscr.addstr(y_pos, title_x, title)
                     self.stdscr.attroff(
-                        curses.color_pair(5)
+                        self.stdscr.color_pair(5)
                         | curses.A_REVERSE
                         | curses.A_BOLD
                     )
                 else:
-                    self.stdscr.addstr(
-                        y_pos,
-                        title_x,
-                        f"{prefix}{title}"[: max(0, results_width - 46)],
-                    )
+                    self.stdscr.addstr(y_pos, title_x, title)
 
                 info = f"  {channel} | {duration}"
+                if result.get("source", "youtube") != "youtube":
+                    info += f" | {result['source']}"
                 if y_pos + 1 < height:
                     self.stdscr.addstr(
                         y_pos + 1,
                         title_x,
-                        info[: max(0, results_width - 46)],
-                        curses.color_pair(6),
+                        self.layout.fit(info, max(0, results_width - 46)),
+                        self.stdscr.color_pair(6),
                     )
 
             y_pos += 8
 
+    def progress_bar_span(self, width: int) -> Tuple[int, int]:
+        """(offset, length) of the bar within the progress line"""
+        cur = self.format_time(self.playback_time)
+        dur = self.format_time(self.playback_duration)
+        return len(cur) + 1, max(10, width - len(cur) - len(dur) - 4)
+
     def draw_progress_bar(self, width: int) -> str:
         cur = self.format_time(self.playback_time)
         dur = self.format_time(self.playback_duration)
 
-      
-        bar_width = max(10, width - len(cur) - len(dur) - 4)
+        _, bar_width = self.progress_bar_span(width)
         pos = 0
         if self.playback_duration > 0:
             pos = int((self.playback_time / self.playback_duration) * bar_width)
@@ -294,7 +2659,7 @@ class YouTubeTUI:
 
         try:
          
-            self.stdscr.attron(curses.color_pair(2))
+            self.stdscr.attron(self.stdscr.color_pair(2))
             if 7 < height:
                 self.stdscr.addstr(
                     7, viz_x, "╔" + "═" * (viz_width - 2) + "╗"
@@ -323,7 +2688,7 @@ class YouTubeTUI:
                     8,
                     viz_x + 1,
                     progress[:inner_width],
-                    curses.color_pair(3) | curses.A_BOLD,
+                    self.stdscr.color_pair(3) | curses.A_BOLD,
                 )
 
           
@@ -357,19 +2722,19 @@ class YouTubeTUI:
                                     row,
                                     viz_x + 1 + col,
                                     "█",
-                                    curses.color_pair(2),
+                                    self.stdscr.color_pair(2),
                                 )
                             except curses.error:
                                 pass
 
-            self.stdscr.attroff(curses.color_pair(2))
+            self.stdscr.attroff(self.stdscr.color_pair(2))
         except Exception:
        
             pass
 
     def draw_lyrics(self):
         """Draw lyrics pane"""
-        if not self.playing or not self.show_lyrics:
+        if not (self.playing or self.lyrics_preview) or not self.show_lyrics:
             return
 
         height, width = self.stdscr.getmaxyx()
@@ -382,7 +2747,7 @@ class YouTubeTUI:
             return
 
         try:
-            self.stdscr.attron(curses.color_pair(3))
+            self.stdscr.attron(self.stdscr.color_pair(3))
             if lyrics_y < height:
                 self.stdscr.addstr(
                     lyrics_y,
@@ -409,9 +2774,9 @@ class YouTubeTUI:
                     lyrics_y,
                     lyrics_x + max(0, (lyrics_width - len(title)) // 2),
                     title,
-                    curses.color_pair(3) | curses.A_BOLD,
+                    self.stdscr.color_pair(3) | curses.A_BOLD,
                 )
-            self.stdscr.attroff(curses.color_pair(3))
+            self.stdscr.attroff(self.stdscr.color_pair(3))
 
             if self.lyrics:
                 start_line = max(0, self.current_lyric_line - 3)
@@ -421,13 +2786,11 @@ class YouTubeTUI:
                     if lyrics_y + 1 + i < height - 6:
                         is_current = start_line + i == self.current_lyric_line
                         color = (
-                            curses.color_pair(3) | curses.A_BOLD
+                            self.stdscr.color_pair(3) | curses.A_BOLD
                             if is_current
-                            else curses.color_pair(6)
-                        )
-                        text = line[: max(0, lyrics_width - 3)].center(
-                            max(0, lyrics_width - 3)
+                            else self.stdscr.color_pair(6)
                         )
+                        text = self.layout.center(line, max(0, lyrics_width - 3))
                         self.stdscr.addstr(
                             lyrics_y + 1 + i, lyrics_x + 1, text, color
                         )
@@ -438,12 +2801,13 @@ class YouTubeTUI:
                         lyrics_y + 2,
                         lyrics_x + max(0, (lyrics_width - len(msg)) // 2),
                         msg,
-                        curses.color_pair(6),
+                        self.stdscr.color_pair(6),
                     )
         except Exception:
             pass
 
-    def format_time(self, seconds: Optional[float]) -> str:
+    @staticmethod
+    def format_time(seconds: Optional[float]) -> str:
         """Format seconds -> MM:SS"""
         if seconds is None:
             return "--:--"
@@ -463,16 +2827,16 @@ class YouTubeTUI:
             y_pos = height - 5
             if y_pos < 0:
                 return
-            self.stdscr.attron(curses.color_pair(1) | curses.A_BOLD)
+            self.stdscr.attron(self.stdscr.color_pair(1) | curses.A_BOLD)
             self.stdscr.addstr(y_pos, 2, "♪ Now Playing:")
-            self.stdscr.attroff(curses.color_pair(1) | curses.A_BOLD)
+            self.stdscr.attroff(self.stdscr.color_pair(1) | curses.A_BOLD)
 
-            title = self.current_video.get("title", "Unknown")[
-                : max(0, width // 2 - 6)
-            ]
+            title = self.layout.fit(
+                self.current_video.get("title", "Unknown"), max(0, width // 2 - 6)
+            )
             if y_pos + 1 < height:
                 self.stdscr.addstr(
-                    y_pos + 1, 2, title, curses.color_pair(3)
+                    y_pos + 1, 2, title, self.stdscr.color_pair(3)
                 )
 
             status = "Playing" if self.playing else "Stopped"
@@ -485,221 +2849,434 @@ class YouTubeTUI:
                         time_str = f" | {cur} / {dur}"
                     else:
                         time_str = f" | {cur}"
+                if self.playing and self.stream_info:
+                    time_str += f" | {self.stream_info}"
                 self.stdscr.addstr(
                     y_pos + 2,
                     2,
-                    f"Status: {status}{time_str}",
-                    curses.color_pair(2),
+                    self.layout.fit(f"Status: {status}{time_str}", max(0, width - 4)),
+                    self.stdscr.color_pair(2),
+                )
+
+    def draw_diagnostics(self):
+        """Overlay with per-stage p50/p95 latency and process stats"""
+        height, width = self.stdscr.getmaxyx()
+        rows = self.tracer.summary()
+        children = child_process_count()
+        lines = [
+            f"{'stage':<26}{'p50 ms':>9}{'p95 ms':>9}{'n':>5}",
+        ]
+        for stage, p50, p95, count in rows:
+            lines.append(
+                f"{stage[:26]:<26}{p50 * 1000:>9.1f}{p95 * 1000:>9.1f}{count:>5}"
+            )
+        lines.append(
+            f"threads: {threading.active_count()}  "
+            f"children: {'-' if children is None else children}"
+        )
+
+        box_width = 51
+        x = max(0, width - box_width - 2)
+        y = 2
+        try:
+            self.stdscr.addstr(
+                y, x, "╔" + " diagnostics ".center(box_width - 2, "═") + "╗",
+                self.stdscr.color_pair(5),
+            )
+            for i, line in enumerate(lines):
+                if y + 1 + i >= height - 3:
+                    break
+                self.stdscr.addstr(
+                    y + 1 + i,
+                    x,
+                    "║" + line[: box_width - 2].ljust(box_width - 2) + "║",
+                    self.stdscr.color_pair(5),
                 )
+            bottom = min(y + 1 + len(lines), height - 3)
+            self.stdscr.addstr(
+                bottom, x, "╚" + "═" * (box_width - 2) + "╝", self.stdscr.color_pair(5)
+            )
+        except curses.error:
+            pass
 
     def draw_help(self):
         """Draw help/keybindings"""
         height, width = self.stdscr.getmaxyx()
         help_text = [
-            "s:Search | Enter:Play | Space:Stop | q:Quit | m:Mode | l:Lyrics",
-            "↑↓:Navigate | n:Next | p:Previous | Mouse:Click to search/play",
+            "s:Search | Enter:Play | Space:Stop | q:Quit | m:Mode | l:Lyrics | d:Diag",
+            "↑↓:Navigate | n:Next | p:Previous | ←→ []:Seek 5s/30s | 0-9:Jump",
         ]
 
         y_pos = height - 2
         for i, text in enumerate(help_text):
             if y_pos + i < height:
                 self.stdscr.addstr(
-                    y_pos + i, 2, text[: max(0, width - 4)], curses.color_pair(4)
+                    y_pos + i, 2, text[: max(0, width - 4)], self.stdscr.color_pair(4)
                 )
 
-    def search_youtube_fast(self, query: str):
-        """Primary search using yt-dlp JSON"""
-        try:
-            cmd = [
-                "yt-dlp",
-                "--flat-playlist",
-                "--dump-single-json",
-                "--default-search",
-                "ytsearch10",
-                "--no-warnings",
-                "--socket-timeout",
-                "10",
-                query,
-            ]
+    def fast_search_cmd(self, query: str) -> List[str]:
+        return [
+            "yt-dlp",
+            "--flat-playlist",
+            "--dump-single-json",
+            "--default-search",
+            "ytsearch10",
+            "--no-warnings",
+            "--socket-timeout",
+            "10",
+            query,
+        ]
 
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, timeout=25
+    def parse_fast_search(self, output: str) -> List[Dict]:
+        """Parse yt-dlp --dump-single-json output"""
+        data = json.loads(output)
+        results = []
+        for entry in data.get("entries", [])[:10]:
+            duration_seconds = entry.get("duration", 0)
+            if duration_seconds:
+                mins = int(duration_seconds // 60)
+                secs = int(duration_seconds % 60)
+                duration_str = f"{mins}:{secs:02d}"
+            else:
+                duration_str = "Live"
+
+            video_id = entry.get("id", "")
+            results.append(
+                {
+                    "title": entry.get("title", "Unknown"),
+                    "id": video_id,
+                    "url": entry.get(
+                        "url", f"https://youtube.com/watch?v={video_id}"
+                    ),
+                    "duration": duration_str,
+                    "channel": entry.get(
+                        "uploader", entry.get("channel", "Unknown")
+                    ),
+                    "thumbnail": entry.get(
+                        "thumbnail",
+                        f"https://i.ytimg.com/vi/{video_id}/default.jpg",
+                    ),
+                }
             )
+        return results
 
-            if result.returncode != 0:
-                return self.search_youtube_fallback(query)
-
-            results = []
-            try:
-                data = json.loads(result.stdout)
-                entries = data.get("entries", [])
-
-                for entry in entries[:10]:
-                    duration_seconds = entry.get("duration", 0)
-                    if duration_seconds:
-                        mins = int(duration_seconds // 60)
-                        secs = int(duration_seconds % 60)
-                        duration_str = f"{mins}:{secs:02d}"
-                    else:
-                        duration_str = "Live"
-
-                    video_id = entry.get("id", "")
-                    video_data = {
-                        "title": entry.get("title", "Unknown"),
-                        "id": video_id,
-                        "url": entry.get(
-                            "url", f"https://youtube.com/watch?v={video_id}"
-                        ),
-                        "duration": duration_str,
-                        "channel": entry.get(
-                            "uploader", entry.get("channel", "Unknown")
-                        ),
-                        "thumbnail": entry.get(
-                            "thumbnail",
-                            f"https://i.ytimg.com/vi/{video_id}/default.jpg",
-                        ),
-                    }
-                    results.append(video_data)
-
-                    if video_data["thumbnail"]:
-                        threading.Thread(
-                            target=self.download_thumbnail,
-                            args=(video_data["id"], video_data["thumbnail"]),
-                            daemon=True,
-                        ).start()
-
-            except json.JSONDecodeError:
-                return self.search_youtube_fallback(query)
+    def fallback_search_cmd(self, query: str) -> List[str]:
+        return [
+            "yt-dlp",
+            "--get-id",
+            "--get-title",
+            "--get-duration",
+            "--default-search",
+            "ytsearch10",
+            "--no-warnings",
+            query,
+        ]
 
-            return results
-        except subprocess.TimeoutExpired:
-            return self.search_youtube_fallback(query)
-        except Exception:
-            return []
+    def parse_fallback_search(self, output: str) -> List[Dict]:
+        """Parse yt-dlp --get-title/--get-duration/--get-id line triples"""
+        lines = output.strip().split("\n")
+        results = []
+        for i in range(0, len(lines) - 2, 3):
+            title = lines[i]
+            duration = lines[i + 1]
+            video_id = lines[i + 2]
+            results.append(
+                {
+                    "title": title,
+                    "id": video_id,
+                    "url": f"https://youtube.com/watch?v={video_id}",
+                    "duration": duration,
+                    "channel": "YouTube",
+                    "thumbnail": f"https://i.ytimg.com/vi/{video_id}/default.jpg",
+                }
+            )
+        return results
 
-    def search_youtube_fallback(self, query: str):
-        """Fallback text-mode search using yt-dlp"""
-        try:
-            cmd = [
-                "yt-dlp",
-                "--get-id",
-                "--get-title",
-                "--get-duration",
-                "--default-search",
-                "ytsearch10",
-                "--no-warnings",
-                query,
-            ]
+    def start_thumbnail_downloads(self, results: List[Dict]):
+        for video in results:
+            if video.get("thumbnail"):
+                threading.Thread(
+                    target=self.download_thumbnail,
+                    args=(video["id"], video["thumbnail"]),
+                    name=f"thumbnail-{video['id']}",
+                    daemon=True,
+                ).start()
 
+    def parse_ytdlp_entries(self, output: str, source: str) -> List[Dict]:
+        """Parse flat-playlist JSON from any yt-dlp search extractor"""
+        data = json.loads(output)
+        results = []
+        for entry in data.get("entries", [])[:10]:
+            duration_seconds = entry.get("duration") or 0
+            if duration_seconds:
+                mins = int(duration_seconds // 60)
+                secs = int(duration_seconds % 60)
+                duration_str = f"{mins}:{secs:02d}"
+            else:
+                duration_str = "N/A"
+
+            thumbnail = entry.get("thumbnail") or ""
+            if not thumbnail and entry.get("thumbnails"):
+                thumbnail = entry["thumbnails"][-1].get("url", "")
+
+            url = entry.get("webpage_url") or entry.get("url") or ""
+            if not url:
+                continue
+            results.append(
+                {
+                    "title": entry.get("title", "Unknown"),
+                    "id": entry.get("id", ""),
+                    "url": url,
+                    "duration": duration_str,
+                    "channel": entry.get(
+                        "uploader", entry.get("channel", "Unknown")
+                    ),
+                    "thumbnail": thumbnail,
+                    "source": source,
+                }
+            )
+        return results
+
+    def ytdlp_search(
+        self, target: str, source: str, timeout: float
+    ) -> List[Dict]:
+        cmd = [
+            "yt-dlp",
+            "--flat-playlist",
+            "--dump-single-json",
+            "--playlist-end",
+            "10",
+            "--no-warnings",
+            "--socket-timeout",
+            "10",
+            target,
+        ]
+        with self.tracer.span(f"search.{source}.yt-dlp"):
             result = subprocess.run(
-                cmd, capture_output=True, text=True, timeout=20
+                cmd, capture_output=True, text=True, timeout=timeout
             )
-
-            lines = result.stdout.strip().split("\n")
-            results = []
-
-            for i in range(0, len(lines) - 2, 3):
-                try:
-                    title = lines[i]
-                    duration = lines[i + 1]
-                    video_id = lines[i + 2]
-
-                    video_data = {
-                        "title": title,
-                        "id": video_id,
-                        "url": f"https://youtube.com/watch?v={video_id}",
-                        "duration": duration,
-                        "channel": "YouTube",
-                        "thumbnail": f"https://i.ytimg.com/vi/{video_id}/default.jpg",
-                    }
-                    results.append(video_data)
-
-                    threading.Thread(
-                        target=self.download_thumbnail,
-                        args=(video_id, video_data["thumbnail"]),
-                        daemon=True,
-                    ).start()
-                except Exception:
-                    continue
-
-            return results
-        except Exception:
+        if result.returncode != 0:
             return []
+        with self.tracer.span(f"search.{source}.parse"):
+            return self.parse_ytdlp_entries(result.stdout, source)
+
+    def build_providers(self, names: str) -> List[SearchProvider]:
+        """Providers selected with --providers, in priority order"""
+        def youtube(query):
+            results = self.hedged_search.run(query)
+            for video in results:
+                video["source"] = "youtube"
+            return results
 
-    def fetch_lyrics(self, title: str):
-        """Fetch lyrics (plain or synced) from lrclib"""
-        self.lyrics = []
-        self.current_lyric_line = 0
-        self.synced_lyrics = []
+        def ytmusic(query):
+            url = "https://music.youtube.com/search?q=" + urllib.parse.quote_plus(
+                query
+            )
+            return self.ytdlp_search(url + "#songs", "ytmusic", 12)
+
+        def soundcloud(query):
+            return self.ytdlp_search(f"scsearch10:{query}", "soundcloud", 12)
+
+        available = {
+            "youtube": SearchProvider("youtube", youtube, 30),
+            "ytmusic": SearchProvider("ytmusic", ytmusic, 12),
+            "soundcloud": SearchProvider("soundcloud", soundcloud, 12),
+        }
+        providers = [
+            available[n.strip()] for n in names.split(",") if n.strip() in available
+        ]
+        return providers or [available["youtube"]]
+
+    def suggest(self, text: str, limit: int = 10) -> List[Dict]:
+        """Type-ahead matches: library files, then seen/played tracks"""
+        local = self.library.search(text, limit)
+        return (local + self.index.search(text, limit))[:limit]
+
+    def start_search(self, query: str):
+        """Search in the background; results appear as providers answer"""
+        self.last_activity = time.monotonic()
+        self.search_generation += 1
+        generation = self.search_generation
+
+        # Local files first, then what we already know while the network
+        # catches up
+        local = self.library.search(query)
+        local_ids = {v["id"] for v in local}
+        known = self.index.cached_search(
+            self.args.providers, query
+        ) or self.index.search(query)
+        self.results = local + [v for v in known if v["id"] not in local_ids]
+        self.selected_index = 0
+        self.searching = True
 
-        try:
-            query = urllib.parse.quote_plus(title)
-            url = f"https://lrclib.net/api/search?q={query}"
+        if self.remote is not None:
+            self.remote_local = (query, local)
+            self.remote_call("search", query=query)
+            return
 
-            with urllib.request.urlopen(url, timeout=8) as resp:
-                data = resp.read().decode("utf-8", errors="ignore")
-                results = json.loads(data)
+        first = True
 
-            if not results:
-                self.lyrics = ["No lyrics found for this track."]
+        def on_update(merged: List[Dict], provider: str):
+            nonlocal first
+            if generation != self.search_generation:
                 return
+            merged = local + [v for v in merged if v["id"] not in local_ids]
+            self.results = merged
+            if first:
+                # Network results replace the provisional local matches
+                first = False
+                self.selected_index = 0
+                self.prefetch_stream(merged[0])
+            self.selected_index = min(self.selected_index, len(merged) - 1)
+            self.index.add_results([v for v in merged if not is_local(v)])
+            self.start_thumbnail_downloads(
+                [v for v in merged if v["id"] not in self.thumbnails]
+            )
 
-            track = results[0]
-
-            plain = track.get("plainLyrics") or ""
-            synced = track.get("syncedLyrics") or ""
+        def worker():
+            try:
+                merged = self.fanout.run(query, on_update)
+                if merged:
+                    self.index.store_search(self.args.providers, query, merged)
+                elif generation == self.search_generation:
+                    # Offline / failed search: serve what we have locally
+                    self.results = local + [
+                        v for v in self.index.search(query)
+                        if v["id"] not in local_ids
+                    ]
+            finally:
+                if generation == self.search_generation:
+                    self.searching = False
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def lrclib_get(self, path: str, params: Dict):
+        """Cached lrclib API call; None on 404 or network failure"""
+        url = f"{LRCLIB_URL}{path}?{urllib.parse.urlencode(params)}"
+        cache_path = os.path.join(cache_dir("lyrics"), cache_file_name(url, ".json"))
+        raw = self.http.fetch_cached(url, cache_path, max_age=7 * 86400)
+        if raw is None:
+            return None
+        return json.loads(raw.decode("utf-8", errors="ignore"))
+
+    def lookup_lyrics(
+        self, title: str, channel: str = "", duration: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Find the lrclib record for a track.
+
+        Tries the exact-match /api/get endpoint with the normalized
+        artist/track and known duration first, then a field search whose
+        candidates are ranked by duration delta (synced lyrics preferred).
+        """
+        artist, track = split_artist_title(title, channel)
+        if artist and track and duration:
+            record = self.lrclib_get(
+                "/api/get",
+                {
+                    "artist_name": artist,
+                    "track_name": track,
+                    "duration": int(round(duration)),
+                },
+            )
+            if isinstance(record, dict) and (
+                record.get("syncedLyrics") or record.get("plainLyrics")
+            ):
+                return record
+
+        params = {"track_name": track}
+        if artist:
+            params["artist_name"] = artist
+        candidates = self.lrclib_get("/api/search", params)
+        if not candidates:
+            candidates = self.lrclib_get("/api/search", {"q": f"{artist} {track}"})
+        if not isinstance(candidates, list) or not candidates:
+            return None
 
-        
-            if synced:
-                synced_list: List[tuple] = []
+        def rank(record: Dict) -> float:
+            delta = 30.0
+            if duration and record.get("duration"):
+                delta = abs(float(record["duration"]) - duration)
+            return delta + (0 if record.get("syncedLyrics") else 5)
 
-                for raw_line in synced.splitlines():
-                    if not raw_line.strip():
-                        continue
+        return min(candidates, key=rank)
 
-                    timestamps = re.findall(r"\[([0-9:.]+)\]", raw_line)
-                    text = re.sub(r"\[[0-9:.]+\]", "", raw_line).strip()
-                    if not text:
-                        continue
+    def load_lyrics(
+        self, title: str, channel: str = "", duration: Optional[float] = None
+    ) -> Tuple[List[str], List[tuple]]:
+        """(lines, synced) from the offline store or lrclib; no UI state"""
+        try:
+            artist, track_name = split_artist_title(title, channel)
+            local = self.lyrics_store.lookup(artist, track_name, duration)
+            if local is not None:
+                if local["synced"]:
+                    return [line for _, line in local["synced"]], local["synced"]
+                return local["plain"], []
 
-                    for ts in timestamps:
-                        try:
-                            if "." in ts:
-                                m, s = ts.split(":")
-                                sec = float(m) * 60 + float(s)
-                            else:
-                                m, s = ts.split(":")
-                                sec = int(m) * 60 + int(s)
-                            synced_list.append((sec, text))
-                        except Exception:
-                            continue
+            track = self.lookup_lyrics(title, channel, duration)
+            if track is None:
+                return ["Lyrics unavailable (network error or not found)."], []
 
-                synced_list.sort(key=lambda x: x[0])
+            plain = track.get("plainLyrics") or ""
+            synced = track.get("syncedLyrics") or ""
 
+            if synced:
+                synced_list, _ = parse_lrc(synced)
                 if synced_list:
-                    self.synced_lyrics = synced_list
-                    self.lyrics = [line for _, line in synced_list]
-                    self.current_lyric_line = 0
-                    return
+                    return [line for _, line in synced_list], synced_list
 
             # Fallback to plain lyrics
             if plain:
-                lines = [
-                    ln.strip() for ln in plain.splitlines() if ln.strip()
-                ]
+                lines = [ln.strip() for ln in plain.splitlines() if ln.strip()]
                 if lines:
-                    self.lyrics = lines
-                    self.current_lyric_line = 0
-                    return
+                    return lines, []
 
-            self.lyrics = ["Lyrics not available for this track."]
-            self.current_lyric_line = 0
+            return ["Lyrics not available for this track."], []
 
         except Exception:
-            self.lyrics = ["Lyrics unavailable (network error or not found)."]
+            return ["Lyrics unavailable (network error or not found)."], []
+
+    def fetch_lyrics(
+        self, title: str, channel: str = "", duration: Optional[float] = None
+    ):
+        """Fetch lyrics (plain or synced) for the track being started"""
+        with self.lyrics_lock:
+            self.lyrics_generation += 1
+            generation = self.lyrics_generation
+            self.lyrics_preview = False
+            self.lyrics = []
             self.current_lyric_line = 0
+            self.synced_lyrics = []
+
+        lines, synced = self.load_lyrics(title, channel, duration)
+        with self.lyrics_lock:
+            if generation == self.lyrics_generation:
+                self.lyrics, self.synced_lyrics = lines, synced
+                self.current_lyric_line = 0
+
+    def restore_lyrics(self, video: Dict):
+        """Lyrics of the restored track, shown while idle. Dropped if a
+        track was started (or another fetch began) in the meantime."""
+        with self.lyrics_lock:
+            generation = self.lyrics_generation
+        lines, synced = self.load_lyrics(
+            video.get("title", ""),
+            video.get("channel", ""),
+            parse_duration(video.get("duration")),
+        )
+        with self.lyrics_lock:
+            if (
+                generation != self.lyrics_generation
+                or self.session is not None
+                or self.current_video is not video
+            ):
+                return
+            self.lyrics, self.synced_lyrics = lines, synced
+            self.current_lyric_line = (
+                self.lyric_index(synced, self.resume_position) if synced else 0
+            )
+            self.lyrics_preview = True
 
-    def update_cava_output(self):
+    def update_cava_output(self, session: PlaybackSession):
         """Spawn cava and generate visualizer output"""
         if not self.has_cava:
             return
@@ -734,10 +3311,11 @@ data_format = ascii
                 text=True,
                 bufsize=1,
             )
+            session.add_process(process)
 
             blocks = ["▁", "▂", "▃", "▄", "▅", "▆", "▇", "█"]
 
-            while self.playing and process.poll() is None:
+            while session.active and process.poll() is None:
                 line = process.stdout.readline()
                 if not line:
                     break
@@ -761,17 +3339,15 @@ data_format = ascii
 
                     viz_line = "".join(blocks[level] for level in vals)
                     # store a single line; visualizer will stack it
-                    self.cava_output = [viz_line]
+                    if session.active:
+                        self.cava_output = [viz_line]
 
                 except Exception:
                     continue
 
-                time.sleep(0.03)
+                session.wait(0.03)
 
-            try:
-                process.terminate()
-            except Exception:
-                pass
+            session.terminate(process)
 
         except Exception:
             self.has_cava = False
@@ -783,6 +3359,10 @@ data_format = ascii
 
     def query_mpv_property(self, prop: str):
         """Query a property from mpv via IPC."""
+        return self.mpv_command("get_property", prop)
+
+    def mpv_command(self, *command):
+        """Run one mpv IPC command; its data, or None on failure"""
         if not self.mpv_socket_path or not os.path.exists(self.mpv_socket_path):
             return None
 
@@ -791,7 +3371,7 @@ data_format = ascii
             s.settimeout(0.5)
             s.connect(self.mpv_socket_path)
             cmd = (
-                json.dumps({"command": ["get_property", prop]}).encode("utf-8")
+                json.dumps({"command": list(command)}).encode("utf-8")
                 + b"\n"
             )
             s.sendall(cmd)
@@ -817,29 +3397,99 @@ data_format = ascii
 
         return None
 
-    def monitor_mpv(self):
+    def monitor_mpv(self, session: PlaybackSession):
         """Background thread to keep track of playback time and duration."""
-        while (
-            self.playing
-            and self.mpv_process is not None
-            and self.mpv_process.poll() is None
-        ):
+        process = self.mpv_process
+        first_pos = True
+        peak_speed = 0.0
+        last_sample = time.monotonic()
+        for poll in itertools.count():
+            if not (session.active and process is not None and process.poll() is None):
+                break
+            seeks = self.seek_count
             pos = self.query_mpv_property("time-pos")
             dur = self.query_mpv_property("duration")
+            if not session.active:
+                break
+            if seeks != self.seek_count:
+                # A seek raced this poll; its own resync has the right time
+                pos = None
             if pos is not None:
+                if first_pos:
+                    first_pos = False
+                    self.tracer.record(
+                        "mpv.first-time-pos",
+                        time.perf_counter() - session.started_at,
+                        profile=self.stream_profile,
+                    )
+                    self.update_stream_info()
                 self.playback_time = pos
             if dur is not None:
                 self.playback_duration = dur
-            time.sleep(0.3)
 
-    def play_video(self, video: Dict):
-        """Start mpv playback and all background helpers"""
-        if self.mpv_process:
+            # cache-speed is the network fill rate; its peak approximates
+            # the link throughput, its integral the bytes transferred
+            if poll % 3 == 0:
+                speed = self.query_mpv_property("cache-speed")
+                now = time.monotonic()
+                if isinstance(speed, (int, float)) and session.active:
+                    self.stream_bytes += speed * (now - last_sample)
+                    peak_speed = max(peak_speed, float(speed))
+                last_sample = now
+            session.wait(0.3)
+
+        if peak_speed > 0:
+            self.throughput.add(peak_speed)
+
+    def update_stream_info(self):
+        """Codec/bitrate and profile for the now-playing pane"""
+        codec = self.query_mpv_property("audio-codec-name")
+        bitrate = self.query_mpv_property("audio-bitrate")
+        parts = []
+        if codec:
+            parts.append(str(codec))
+        if isinstance(bitrate, (int, float)) and bitrate > 0:
+            parts.append(f"{int(bitrate) // 1000}k")
+        if self.stream_profile:
+            parts.append(f"[{self.stream_profile}]")
+        self.stream_info = " ".join(parts)
+
+    def quality_profile(self) -> str:
+        """Profile for the next stream; auto follows measured throughput"""
+        quality = self.args.quality
+        if quality == "auto":
+            return self.throughput.pick(self.audio_only)
+        return quality
+
+    def stream_format(self, profile: Optional[str] = None) -> str:
+        """yt-dlp format selector for the current mode and profile"""
+        selected = QUALITY_PROFILES[profile or self.quality_profile()]
+        return selected["audio"] if self.audio_only else selected["video"]
+
+    def prefetch_stream(self, video: Dict):
+        """Resolve the stream URL of a track before it is played"""
+        if video.get("id") and not is_local(video):
+            self.resolver.resolve_async(
+                video["id"], video["url"], self.stream_format()
+            )
+
+    def play_video(self, video: Dict, start: float = 0.0):
+        """Start mpv playback (at `start` seconds) and all background helpers"""
+        if self.remote is not None:
+            self.remote_call("play", video=video, start=start)
+            return
+
+        if self.session is not None:
             self.stop_playback()
 
+        self.last_activity = time.monotonic()
+        started = time.perf_counter()
+        session = PlaybackSession()
+        self.session = session
+
         try:
             self.mpv_socket_path = self.build_mpv_socket_path()
-            self.playback_time = 0.0
+            self.playback_time = start
             self.playback_duration = 0.0
 
             cmd = [
@@ -850,76 +3500,201 @@ data_format = ascii
             ]
             if self.audio_only:
                 cmd.append("--no-video")
-            cmd.append(video["url"])
-
-            self.mpv_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
+            if start > 0:
+                cmd.append(f"--start={start:.1f}")
+
+            url, headers = video["url"], None
+            self.stream_info = ""
+            self.stream_bytes = 0.0
+            self.stream_profile = ""
+            if video.get("id") and not is_local(video):
+                self.stream_profile = self.quality_profile()
+                fmt = self.stream_format(self.stream_profile)
+                cmd.append(f"--ytdl-format={fmt}")
+                # Keep played data (back buffer) seekable so seeks inside
+                # the buffered range never go back to the network
+                cmd.append("--cache=yes")
+                cmd.append("--demuxer-seekable-cache=yes")
+                cmd.append("--force-seekable=yes")
+                cmd.extend(QUALITY_PROFILES[self.stream_profile]["cache"])
+                with self.tracer.span("stream.lookup"):
+                    url, headers = self.resolver.playable_url(
+                        video["id"], video["url"], fmt
+                    )
+            if headers is not None:
+                cmd.append("--ytdl=no")
+                cmd.append(f"--force-media-title={video.get('title', '')}")
+                for name, value in headers.items():
+                    if name.lower() == "user-agent":
+                        cmd.append(f"--user-agent={value}")
+                    else:
+                        cmd.append(f"--http-header-fields-append={name}: {value}")
+            cmd.append(url)
+
+            with self.tracer.span("mpv.spawn"):
+                self.mpv_process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            session.add_process(self.mpv_process)
+            session.started_at = started
 
             self.playing = True
             self.current_video = video
+            if not is_local(video):
+                self.index.mark_played(video)
+
+            # Resolve the next result while this one plays
+            if video in self.results:
+                idx = self.results.index(video)
+                self.prefetch_stream(self.results[(idx + 1) % len(self.results)])
 
             # Fetch lyrics (may populate synced_lyrics)
-            self.fetch_lyrics(video["title"])
+            with self.tracer.span("lyrics.fetch"):
+                self.fetch_lyrics(
+                    video["title"],
+                    video.get("channel", ""),
+                    parse_duration(video.get("duration")),
+                )
 
             # Start mpv monitor thread
-            threading.Thread(
-                target=self.monitor_mpv, daemon=True
-            ).start()
+            session.spawn(self.monitor_mpv, "mpv-monitor")
 
             # Start Cava visualizer if available
             if self.has_cava:
-                self.cava_thread = threading.Thread(
-                    target=self.update_cava_output, daemon=True
+                self.cava_thread = session.spawn(
+                    self.update_cava_output, "cava-reader"
                 )
-                self.cava_thread.start()
 
             # Start synced lyrics updater (only if we have synced lyrics)
             if self.synced_lyrics:
-                threading.Thread(
-                    target=self.animate_lyrics, daemon=True
-                ).start()
+                session.spawn(self.animate_lyrics, "lyrics-animator")
 
         except Exception:
             self.playing = False
 
-    def animate_lyrics(self):
+    def animate_lyrics(self, session: PlaybackSession):
         """Advance lyrics based on actual mpv playback time via IPC."""
-        if not self.synced_lyrics:
+        synced = self.synced_lyrics
+        if not synced:
             return
 
-        while (
-            self.playing
-            and self.mpv_process is not None
-            and self.mpv_process.poll() is None
-        ):
-            t = self.playback_time
-            idx = 0
-            for i, (ts, _) in enumerate(self.synced_lyrics):
-                if ts <= t:
-                    idx = i
-                else:
-                    break
-            self.current_lyric_line = idx
-            time.sleep(0.1)
+        process = self.mpv_process
+        while session.active and process is not None and process.poll() is None:
+            idx = self.lyric_index(synced, self.playback_time)
+            if session.active:
+                self.current_lyric_line = idx
+            session.wait(0.1)
+
+    @staticmethod
+    def lyric_index(synced: List[tuple], t: float) -> int:
+        idx = 0
+        for i, (ts, _) in enumerate(synced):
+            if ts <= t:
+                idx = i
+            else:
+                break
+        return idx
+
+    def seek(self, target: float, mode: str = "relative"):
+        """Seek (relative seconds, absolute seconds or absolute-percent).
+
+        Time and lyric line jump immediately; a short-lived thread sends
+        the seek and resyncs from mpv's position once playback restarts.
+        """
+        if self.remote is not None:
+            self.remote_call("seek", target=target, mode=mode)
+            return
+
+        session = self.session
+        if session is None or not self.playing:
+            return
+
+        duration = self.playback_duration
+        if mode == "absolute-percent":
+            position = duration * target / 100
+        elif mode == "absolute":
+            position = target
+        else:
+            position = self.playback_time + target
+        if duration:
+            position = min(position, duration)
+        position = max(0.0, position)
+
+        self.seek_count += 1
+        seq = self.seek_count
+        self.playback_time = position
+        if self.synced_lyrics:
+            self.current_lyric_line = self.lyric_index(self.synced_lyrics, position)
+        session.spawn(
+            lambda s: self.sync_seek(s, position, seq), "mpv-seek"
+        )
+
+    def sync_seek(self, session: PlaybackSession, position: float, seq: int):
+        """Send an absolute seek and adopt mpv's time on playback-restart"""
+        path = self.mpv_socket_path
+        if not path:
+            return
+        started = time.perf_counter()
+        pos = None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(2)
+                conn.connect(path)
+                reader = conn.makefile("rb")
+                conn.sendall(
+                    json.dumps({"command": ["seek", position, "absolute"]}).encode()
+                    + b"\n"
+                )
+                for line in reader:
+                    msg = json.loads(line)
+                    if msg.get("event") == "playback-restart":
+                        break
+                    if msg.get("error") not in (None, "success"):
+                        return
+                conn.sendall(
+                    json.dumps({"command": ["get_property", "time-pos"]}).encode()
+                    + b"\n"
+                )
+                for line in reader:
+                    msg = json.loads(line)
+                    if "error" in msg:
+                        pos = msg.get("data")
+                        break
+        except Exception:
+            return
+
+        self.tracer.record("mpv.seek", time.perf_counter() - started)
+        if session.active and seq == self.seek_count and isinstance(pos, (int, float)):
+            self.playback_time = pos
+            if self.synced_lyrics:
+                self.current_lyric_line = self.lyric_index(self.synced_lyrics, pos)
 
     def stop_playback(self):
         """Stop mpv + reset visualizer, lyrics, IPC"""
-        if self.mpv_process:
-            self.mpv_process.terminate()
-            try:
-                self.mpv_process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                self.mpv_process.kill()
-            self.mpv_process = None
+        if self.remote is not None:
+            self.remote_call("stop")
+            return
+
+        # Stopped by the user (not at the end of the track): remember where
+        self.resume_position = 0.0
+        if self.mpv_process is not None and self.mpv_process.poll() is None:
+            self.resume_position = self.playback_time
+
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+        self.mpv_process = None
+        self.cava_thread = None
 
         self.playing = False
+        self.lyrics_preview = False
         self.cava_output = []
         self.playback_time = 0.0
         self.playback_duration = 0.0
         self.synced_lyrics = []
+        self.stream_info = ""
 
         if self.mpv_socket_path:
             try:
@@ -931,14 +3706,22 @@ data_format = ascii
 
     def handle_mouse(self, mouse_event):
         try:
-            _, x, y, _, bstate = curses.getmouse()
+            _, x, y, _, bstate = self.stdscr.getmouse()
             height, width = self.stdscr.getmaxyx()
 
+            # Click on the progress bar (row 8 of the visualizer box)
+            if y == 8 and self.playing and self.has_cava:
+                offset, length = self.progress_bar_span(width // 2 - 6)
+                rel = x - (width // 2 + 3 + offset)
+                if 0 <= rel < length:
+                    self.seek(100 * rel / max(1, length - 1), "absolute-percent")
+                    return
+
             # Click in search box
             if y == 3 and 11 <= x < width - 2:
                 self.search_mode = True
                 self.search_input = self.search_query
-                curses.curs_set(1)
+                self.stdscr.curs_set(1)
                 return
 
             # Click on results
@@ -964,6 +3747,11 @@ data_format = ascii
 
     def handle_input(self, key):
         height, width = self.stdscr.getmaxyx()
+        self.last_activity = time.monotonic()
+
+        if key == curses.KEY_RESIZE:
+            self.layout.clear()
+            return True
 
         if key == curses.KEY_MOUSE:
             self.handle_mouse(key)
@@ -972,33 +3760,25 @@ data_format = ascii
         if self.search_mode:
             if key == 27:
                 self.search_mode = False
-                curses.curs_set(0)
+                self.suggestions = []
+                self.stdscr.curs_set(0)
                 return True
             elif key in (ord("\n"), curses.KEY_ENTER, 10):
                 if self.search_input.strip():
                     self.search_query = self.search_input.strip()
                     self.search_mode = False
-                    curses.curs_set(0)
-
-                    self.stdscr.addstr(
-                        5,
-                        2,
-                        "Searching..." + " " * 50,
-                        curses.color_pair(3),
-                    )
-                    self.stdscr.refresh()
-
-                    self.results = self.search_youtube_fast(
-                        self.search_query
-                    )
-                    self.selected_index = 0
+                    self.stdscr.curs_set(0)
+                    self.suggestions = []
+                    self.start_search(self.search_query)
                 return True
             elif key in (curses.KEY_BACKSPACE, 127, 8):
                 if self.search_input:
                     self.search_input = self.search_input[:-1]
+                    self.suggestions = self.suggest(self.search_input)
                 return True
             elif 32 <= key <= 126:
                 self.search_input += chr(key)
+                self.suggestions = self.suggest(self.search_input)
                 return True
             return True
 
@@ -1007,9 +3787,11 @@ data_format = ascii
         elif key == ord("s"):
             self.search_mode = True
             self.search_input = self.search_query
-            curses.curs_set(1)
+            self.stdscr.curs_set(1)
         elif key == ord("l"):
             self.show_lyrics = not self.show_lyrics
+        elif key == ord("d"):
+            self.show_diagnostics = not self.show_diagnostics
         elif key == curses.KEY_UP and self.results:
             self.selected_index = max(0, self.selected_index - 1)
         elif key == curses.KEY_DOWN and self.results:
@@ -1023,8 +3805,20 @@ data_format = ascii
                 self.play_video(self.results[self.selected_index])
         elif key == ord(" "):
             self.stop_playback()
+        elif key == curses.KEY_LEFT:
+            self.seek(-5)
+        elif key == curses.KEY_RIGHT:
+            self.seek(5)
+        elif key == ord("["):
+            self.seek(-30)
+        elif key == ord("]"):
+            self.seek(30)
+        elif ord("0") <= key <= ord("9"):
+            self.seek((key - ord("0")) * 10, "absolute-percent")
         elif key == ord("m"):
             self.audio_only = not self.audio_only
+            if self.remote is not None:
+                self.remote_call("mode", audio_only=self.audio_only)
         elif key == ord("n") and self.results:
             self.selected_index = (self.selected_index + 1) % len(
                 self.results
@@ -1040,9 +3834,190 @@ data_format = ascii
 
         return True
 
-    def run(self):
+    STATE_FIELDS = (
+        "search_query",
+        "results",
+        "searching",
+        "playing",
+        "current_video",
+        "audio_only",
+        "playback_time",
+        "playback_duration",
+        "lyrics",
+        "current_lyric_line",
+        "cava_output",
+        "has_cava",
+        "stream_info",
+    )
+
+    def player_state(self) -> Dict:
+        """Snapshot of everything a client needs to draw the player"""
+        return {name: getattr(self, name) for name in self.STATE_FIELDS}
+
+    def apply_state(self, changes: Dict):
+        """Mirror state pushed by the daemon"""
+        for name, value in changes.items():
+            if name == "search_query" and self.search_mode:
+                continue
+            if name in self.STATE_FIELDS:
+                setattr(self, name, value)
+        query, local = self.remote_local
+        if "results" in changes and local and query == self.search_query:
+            # Keep this client's library hits on top of the daemon's results
+            ids = {v["id"] for v in self.results}
+            self.results = [v for v in local if v["id"] not in ids] + self.results
+        if "results" in changes:
+            self.selected_index = min(
+                self.selected_index, max(0, len(self.results) - 1)
+            )
+            missing = [v for v in self.results if v.get("id") not in self.thumbnails]
+            if missing:
+                threading.Thread(
+                    target=self.fetch_remote_thumbnails,
+                    args=(missing,),
+                    name="thumbnail-remote",
+                    daemon=True,
+                ).start()
+
+    def fetch_remote_thumbnails(self, videos: List[Dict]):
+        for video in videos:
+            try:
+                lines = self.remote.call("thumbnail", id=video.get("id", ""))
+            except Exception:
+                return
+            if lines:
+                self.thumbnails[video["id"]] = lines
+
+    def remote_call(self, cmd: str, **params):
         try:
-            while True:
+            return self.remote.call(cmd, **params)
+        except Exception:
+            return None
+
+    def attach(self, client: "DaemonClient"):
+        """Drive a running daemon instead of a local mpv"""
+        self.remote = client
+
+        def on_close():
+            self.remote = None
+            self.playing = False
+            self.searching = False
+
+        client.watch(self.apply_state, on_close)
+
+    def draw_frame(self):
+        """Render one full frame"""
+        frame_start = time.perf_counter()
+        self.stdscr.clear()
+
+        self.draw_header()
+        self.draw_search_box()
+        self.draw_results()
+
+        if self.playing:
+            self.draw_cava_visualizer()
+        if self.playing or self.lyrics_preview:
+            self.draw_lyrics()
+
+        self.draw_now_playing()
+        self.draw_help()
+
+        if self.show_diagnostics:
+            self.draw_diagnostics()
+
+        self.stdscr.refresh()
+        self.tracer.record("frame", time.perf_counter() - frame_start)
+
+    def session_snapshot(self) -> Dict:
+        """What the next start needs to put the player back where it was.
+
+        The results list doubles as the play queue (n/p walk it).
+        """
+        return {
+            "version": 1,
+            "search_query": self.search_query,
+            "results": self.results,
+            "selected_index": self.selected_index,
+            "current_video": self.current_video,
+            "position": round(
+                self.playback_time if self.playing else self.resume_position, 1
+            ),
+            "audio_only": self.audio_only,
+            "show_lyrics": self.show_lyrics,
+        }
+
+    def save_session(self):
+        """Atomically write the snapshot if it changed since the last write"""
+        if self.remote is not None:
+            return
+        try:
+            text = json.dumps(self.session_snapshot())
+            if text == self.saved_session:
+                return
+            tmp = self.session_file + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, self.session_file)
+            self.saved_session = text
+        except Exception:
+            pass
+
+    def restore_session(self, fetch_lyrics: bool = True) -> Optional[Dict]:
+        """Load the last snapshot with cached thumbnails; no network"""
+        try:
+            with open(self.session_file) as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != 1:
+                return None
+        except Exception:
+            return None
+
+        self.search_query = snapshot.get("search_query") or ""
+        self.results = [r for r in snapshot.get("results") or [] if r.get("url")]
+        self.selected_index = min(
+            max(0, int(snapshot.get("selected_index") or 0)),
+            max(0, len(self.results) - 1),
+        )
+        self.current_video = snapshot.get("current_video")
+        self.audio_only = bool(snapshot.get("audio_only", True))
+        self.show_lyrics = bool(snapshot.get("show_lyrics", True))
+        self.resume_position = float(snapshot.get("position") or 0.0)
+        for video in self.results:
+            cached = self.load_ascii_thumbnail(video.get("id", ""))
+            if cached is not None:
+                self.thumbnails[video["id"]] = cached
+
+        if self.current_video and fetch_lyrics:
+            threading.Thread(
+                target=self.restore_lyrics,
+                args=(self.current_video,),
+                name="lyrics-restore",
+                daemon=True,
+            ).start()
+        self.saved_session = json.dumps(snapshot)
+        return snapshot
+
+    def run(self, max_frames: Optional[int] = None, interactive: bool = True):
+        """Main loop. Non-interactive (headless) runs don't prefetch and
+        neither restore nor save the session"""
+        frames = 0
+        persist = interactive and self.remote is None
+        if persist and not self.args.no_restore:
+            # Resuming fetches lyrics through play_video; a second fetch
+            # racing it could reset the lyrics under the animator
+            snapshot = self.restore_session(fetch_lyrics=not self.args.resume)
+            if snapshot and self.args.resume and self.current_video:
+                self.play_video(self.current_video, self.resume_position)
+        warm = persist and not self.args.no_warm
+        if warm:
+            self.warmer.start()
+        next_save = time.monotonic() + 15
+        try:
+            while max_frames is None or frames < max_frames:
+                frames += 1
+                if persist and time.monotonic() >= next_save:
+                    next_save = time.monotonic() + 15
+                    self.save_session()
                 # auto-stop when mpv finishes naturally
                 if (
                     self.mpv_process is not None
@@ -1051,20 +4026,7 @@ data_format = ascii
                 ):
                     self.stop_playback()
 
-                self.stdscr.clear()
-
-                self.draw_header()
-                self.draw_search_box()
-                self.draw_results()
-
-                if self.playing:
-                    self.draw_cava_visualizer()
-                    self.draw_lyrics()
-
-                self.draw_now_playing()
-                self.draw_help()
-
-                self.stdscr.refresh()
+                self.draw_frame()
 
                 key = self.stdscr.getch()
                 if key != -1:
@@ -1073,10 +4035,747 @@ data_format = ascii
 
                 time.sleep(0.01)
         finally:
-            self.stop_playback()
+            if warm:
+                self.warmer.stop()
+            if persist:
+                self.save_session()
+            if self.remote is None:
+                self.stop_playback()
+            self.tracer.close()
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second after a burst"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens now, going into debt if needed; returns how
+        long the caller should wait before using them"""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+MATCH_PENALTIES = ("live", "cover", "remix", "karaoke", "instrumental", "8d")
+
+
+def match_score(query: str, video: Dict) -> float:
+    """How well a result matches an 'artist - title' query line"""
+    wanted = set(re.findall(r"\w+", query.lower()))
+    title = video.get("title", "") + " " + video.get("channel", "")
+    have = set(re.findall(r"\w+", title.lower()))
+    if not wanted:
+        return 0.0
+    score = len(wanted & have) / len(wanted)
+    for word in MATCH_PENALTIES:
+        if word in have and word not in wanted:
+            score -= 0.25
+    return score
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Resolve a file of queries concurrently, streaming NDJSON to stdout"""
+    if args.batch == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.batch, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    queries = [
+        (n, line.strip())
+        for n, line in enumerate(lines, 1)
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+    engine = YouTubeTUI(None, args)
+    limiter = RateLimiter(args.rate, burst=args.jobs)
+    out_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def resolve(n: int, query: str) -> Dict:
+        queued = time.perf_counter()
+        record: Dict = {"line": n, "query": query, "cached": False}
+        # Same providers and cache key as interactive search, so either
+        # mode reuses the other's results
+        results = engine.index.cached_search(args.providers, query)
+        search_start = time.perf_counter()
+        if results is None:
+            limiter.acquire()
+            search_start = time.perf_counter()
+            try:
+                results = engine.fanout.run(query)
+            except Exception as e:
+                results = []
+                record["error"] = str(e)
+            if results:
+                engine.index.store_search(args.providers, query, results)
+                engine.index.add_results(results)
+        else:
+            record["cached"] = True
+        done = time.perf_counter()
+
+        ranked = sorted(results, key=lambda v: -match_score(query, v))
+        record["best"] = ranked[0] if ranked else None
+        record["alternatives"] = ranked[1:5]
+        record["timings"] = {
+            "queued_ms": round((search_start - queued) * 1000, 1),
+            "search_ms": round((done - search_start) * 1000, 1),
+        }
+        if not ranked and "error" not in record:
+            record["error"] = "no results"
+        return record
+
+    failures = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(resolve, n, q) for n, q in queries]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            if record["best"] is None:
+                failures += 1
+            try:
+                with out_lock:
+                    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    sys.stdout.flush()
+            except BrokenPipeError:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    engine.tracer.close()
+    print(
+        f"resolved {len(queries) - failures}/{len(queries)} queries "
+        f"in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr,
+    )
+    return 0 if not failures else 2
+
+
+def daemon_socket_path() -> str:
+    """Control socket of the player daemon"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "yaap.sock")
+    return os.path.join(cache_dir(), "daemon.sock")
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    """Line-delimited JSON client for the player daemon"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 60):
+        self.socket_path = socket_path or daemon_socket_path()
+        self.timeout = timeout
+
+    def connect(self) -> socket.socket:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        s.connect(self.socket_path)
+        return s
+
+    def alive(self) -> bool:
+        try:
+            self.call("ping", timeout=1)
+            return True
+        except Exception:
+            return False
+
+    def call(self, cmd: str, timeout: Optional[float] = None, **params):
+        request = dict(params, cmd=cmd)
+        with self.connect() as s:
+            if timeout is not None:
+                s.settimeout(timeout)
+            s.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = s.makefile("rb").readline()
+        if not line:
+            raise DaemonError("daemon closed the connection")
+        response = json.loads(line.decode("utf-8"))
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "unknown error"))
+        return response.get("data")
+
+    def watch(self, on_change, on_close=None, interval: float = 0.05):
+        """Stream state changes to on_change(dict) from a background thread"""
+
+        def worker():
+            try:
+                with self.connect() as s:
+                    s.settimeout(None)
+                    s.sendall(
+                        json.dumps({"cmd": "watch", "interval": interval}).encode(
+                            "utf-8"
+                        )
+                        + b"\n"
+                    )
+                    for line in s.makefile("rb"):
+                        event = json.loads(line.decode("utf-8"))
+                        if event.get("event") == "state":
+                            on_change(event["data"])
+            except Exception:
+                pass
+            if on_close is not None:
+                on_close()
+
+        thread = threading.Thread(target=worker, name="daemon-watch", daemon=True)
+        thread.start()
+        return thread
+
+
+def daemon_args(args: Optional[argparse.Namespace]) -> List[str]:
+    """Options of this invocation that a spawned daemon has to honour"""
+    if args is None:
+        return []
+    out = ["--providers", args.providers, "--quality", args.quality]
+    if args.hedge_delay is not None:
+        out += ["--hedge-delay", str(args.hedge_delay)]
+    for folder in args.library or []:
+        out += ["--library", os.path.abspath(os.path.expanduser(folder))]
+    if args.trace:
+        out += ["--trace", os.path.abspath(args.trace)]
+    if args.no_warm:
+        out.append("--no-warm")
+    if args.prebuffer:
+        out += ["--prebuffer", str(args.prebuffer)]
+    if args.warm_connections:
+        out.append("--warm-connections")
+    return out
+
+
+def start_daemon(
+    args: Optional[argparse.Namespace] = None,
+    socket_path: Optional[str] = None,
+    wait: float = 5.0,
+) -> DaemonClient:
+    """Return a client for the daemon, spawning one with this invocation's
+    options if none is running"""
+    client = DaemonClient(socket_path)
+    if client.alive():
+        return client
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)] + daemon_args(args) + ["daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if client.alive():
+            return client
+        time.sleep(0.05)
+    raise DaemonError("daemon did not start")
+
+
+class PlayerDaemon:
+    """Background process that owns mpv, the queue, caches and workers.
+
+    Clients talk to it over a Unix socket, one JSON object per line:
+    {"cmd": "play", "index": 2} -> {"ok": true, "data": ...}. A "watch"
+    request turns the connection into a stream of state changes, so any
+    number of TUIs can attach, detach and reattach without touching
+    playback.
+    """
+
+    def __init__(self, args: argparse.Namespace, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or daemon_socket_path()
+        self.player = YouTubeTUI(None, args)
+        self.lock = threading.Lock()
+        self.running = True
+
+    def play_index(self, index: int):
+        player = self.player
+        if not player.results:
+            raise DaemonError("queue is empty")
+        player.selected_index = index % len(player.results)
+        player.play_video(player.results[player.selected_index])
+
+    def play_query(self, query: str):
+        """Search, then play the best match. The search (up to the fan-out
+        deadline) runs outside the lock so status, stop, seek and watchers
+        of other clients are not held up."""
+        player = self.player
+        local = player.library.search(query)
+        ids = {v["id"] for v in local}
+        results = local + [v for v in player.fanout.run(query) if v["id"] not in ids]
+        player.index.add_results([v for v in results if not is_local(v)])
+        with self.lock:
+            player.search_query = query
+            player.results = results
+            player.start_thumbnail_downloads(results)
+            self.play_index(0)
+            return player.current_video
+
+    def handle(self, request: Dict):
+        player = self.player
+        cmd = request.get("cmd")
+
+        if cmd == "ping":
+            return "pong"
+        if cmd == "status":
+            state = player.player_state()
+            state["selected_index"] = player.selected_index
+            return state
+        if cmd == "thumbnail":
+            return player.thumbnails.get(request.get("id", ""))
+        if cmd == "play" and request.get("query") and not request.get("video"):
+            return self.play_query(request["query"])
+
+        with self.lock:
+            if cmd == "search":
+                player.search_query = request["query"]
+                player.start_search(request["query"])
+            elif cmd == "play":
+                if request.get("video"):
+                    video = request["video"]
+                    if video in player.results:
+                        player.selected_index = player.results.index(video)
+                    player.play_video(video, float(request.get("start", 0)))
+                else:
+                    self.play_index(int(request.get("index", player.selected_index)))
+            elif cmd == "next":
+                self.play_index(player.selected_index + 1)
+            elif cmd == "prev":
+                self.play_index(player.selected_index - 1)
+            elif cmd == "stop":
+                player.stop_playback()
+            elif cmd == "seek":
+                player.seek(
+                    float(request.get("target", 0)),
+                    request.get("mode", "relative"),
+                )
+            elif cmd == "mode":
+                player.audio_only = bool(
+                    request.get("audio_only", not player.audio_only)
+                )
+            elif cmd == "shutdown":
+                self.running = False
+            else:
+                raise DaemonError(f"unknown command: {cmd}")
+        return player.current_video
+
+    def stream_state(self, conn: socket.socket, interval: float):
+        last: Dict = {}
+        while self.running:
+            state = self.player.player_state()
+            changes = {k: v for k, v in state.items() if last.get(k) != v}
+            if changes:
+                conn.sendall(
+                    json.dumps({"event": "state", "data": changes}).encode("utf-8")
+                    + b"\n"
+                )
+                last = state
+            time.sleep(interval)
+
+    def serve_client(self, conn: socket.socket):
+        with conn:
+            try:
+                line = conn.makefile("rb").readline()
+                if not line:
+                    return
+                request = json.loads(line.decode("utf-8"))
+                if request.get("cmd") == "watch":
+                    self.stream_state(conn, float(request.get("interval", 0.05)))
+                    return
+                try:
+                    response = {"ok": True, "data": self.handle(request)}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+            except Exception:
+                pass
+
+    def housekeeping(self):
+        """Reap mpv when a track ends on its own"""
+        player = self.player
+        while self.running:
+            if (
+                player.mpv_process is not None
+                and player.mpv_process.poll() is not None
+                and player.playing
+            ):
+                with self.lock:
+                    player.stop_playback()
+            time.sleep(0.5)
+
+    def serve_forever(self):
+        if DaemonClient(self.socket_path).alive():
+            raise DaemonError("daemon already running")
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(16)
+        server.settimeout(0.5)
+        threading.Thread(
+            target=self.housekeeping, name="daemon-housekeeping", daemon=True
+        ).start()
+        if not self.player.args.no_warm:
+            self.player.warmer.start()
+
+        try:
+            while self.running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(
+                    target=self.serve_client,
+                    args=(conn,),
+                    name="daemon-client",
+                    daemon=True,
+                ).start()
+        finally:
+            server.close()
+            self.player.stop_playback()
+            self.player.tracer.close()
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+
+def parse_seek(text: str) -> Tuple[float, str]:
+    """'+10' / '-10' relative, '90' or '1:30' absolute, '50%' percent"""
+    value = text.strip()
+    try:
+        if value.endswith("%"):
+            target, mode = float(value[:-1]), "absolute-percent"
+        elif value[:1] in "+-":
+            target, mode = float(value), "relative"
+        else:
+            target, mode = 0.0, "absolute"
+            for part in value.split(":"):
+                target = target * 60 + float(part)
+    except ValueError:
+        target, mode = float("nan"), ""
+    if target != target or target in (float("inf"), float("-inf")):
+        raise argparse.ArgumentTypeError(f"invalid seek position: {text!r}")
+    return target, mode
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """One-shot CLI commands against the daemon"""
+    if args.command == "import-lyrics":
+        started = time.perf_counter()
+        store = LyricsStore(os.path.join(cache_dir(), "lyrics.db"))
+        summary = store.import_paths(args.dirs, args.jobs)
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        print(json.dumps(summary))
+        return 0
+
+    if args.command == "scan-library":
+        roots = args.dirs or library_roots(args)
+        if not roots:
+            print("No library directories given (use --library or $YAAP_LIBRARY)")
+            return 1
+        started = time.perf_counter()
+        library = MusicLibrary(os.path.join(cache_dir(), "library.db"))
+        summary = library.scan(roots, args.jobs)
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        print(json.dumps(summary))
+        return 0
+
+    if args.command == "status":
+        client = DaemonClient()
+        if not client.alive():
+            print("yaap daemon is not running")
+            return 1
+        state = client.call("status")
+        if args.json:
+            print(json.dumps(state))
+        else:
+            video = state.get("current_video") or {}
+            status = "Playing" if state.get("playing") else "Stopped"
+            print(f"{status}: {video.get('title', '-')}")
+            if state.get("playing"):
+                cur = YouTubeTUI.format_time(state.get("playback_time"))
+                dur = YouTubeTUI.format_time(state.get("playback_duration"))
+                print(f"{cur} / {dur}")
+        return 0
+
+    if args.command == "quit":
+        client = DaemonClient()
+        if client.alive():
+            client.call("shutdown")
+        return 0
+
+    client = start_daemon(args)
+    params: Dict = {}
+    if args.command == "seek":
+        params["target"], params["mode"] = args.position
+    if args.command == "play":
+        if args.query:
+            params["query"] = " ".join(args.query)
+        elif args.index is not None:
+            params["index"] = args.index
+    video = client.call(args.command, **params)
+    if video:
+        print(f"♪ {video.get('title', '')}")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="yaap", description="Yet Another Audio Player"
+    )
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="start the fallback search after this long "
+        "(default: adapt to observed search latency)",
+    )
+    parser.add_argument(
+        "--providers",
+        default="youtube,ytmusic,soundcloud",
+        metavar="LIST",
+        help="comma-separated search providers queried in parallel "
+        "(youtube, ytmusic, soundcloud)",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=["auto"] + list(QUALITY_PROFILES),
+        default="auto",
+        help="stream quality profile; auto picks one from the throughput "
+        "measured on earlier streams (default: auto)",
+    )
+    parser.add_argument(
+        "--library",
+        action="append",
+        metavar="DIR",
+        help="local music directory to index and search (repeatable; "
+        "default: $YAAP_LIBRARY)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="append per-stage timing spans to FILE as JSON lines",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        help="sample all thread stacks while running; on exit write "
+        "PREFIX.collapsed (flame graph input) and PREFIX.pstats (main thread)",
+    )
+    parser.add_argument(
+        "--profile-rate",
+        type=float,
+        default=100.0,
+        metavar="HZ",
+        help="stack samples per second for --profile (default: 100)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the last played track where it was left",
+    )
+    parser.add_argument(
+        "--no-restore",
+        action="store_true",
+        help="start empty instead of restoring the last session",
+    )
+    parser.add_argument(
+        "--no-warm",
+        action="store_true",
+        help="don't prefetch likely next tracks while idle",
+    )
+    parser.add_argument(
+        "--prebuffer",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="while idle, also fetch the first SECONDS of likely next "
+        "tracks (default: 0, off)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run against an in-memory screen and print frame timings",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=300,
+        help="frames to run in --headless mode (default: 300)",
+    )
+    parser.add_argument(
+        "--keys",
+        default="",
+        metavar="SCRIPT",
+        help="scripted input for --headless, e.g. 's|query|ENTER|@50|DOWN|ENTER'",
+    )
+    parser.add_argument(
+        "--size",
+        default="160x50",
+        metavar="COLSxROWS",
+        help="screen size for --headless (default: 160x50)",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="resolve one 'artist - title' query per line of FILE ('-' for "
+        "stdin) and print NDJSON results",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=8,
+        help="concurrent searches in --batch mode (default: 8)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=4.0,
+        help="max queries started per second in --batch mode "
+        "(default: 4, 0 = unlimited)",
+    )
+    parser.add_argument(
+        "--warm-connections",
+        action="store_true",
+        help="open connections to i.ytimg.com and lrclib at startup",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.add_parser("daemon", help="run the player daemon in the foreground")
+    play = commands.add_parser("play", help="play a search query or queue entry")
+    play.add_argument("query", nargs="*", help="search and play the best match")
+    play.add_argument("--index", type=int, help="play this queue entry instead")
+    commands.add_parser("next", help="play the next queue entry")
+    commands.add_parser("prev", help="play the previous queue entry")
+    commands.add_parser("stop", help="stop playback")
+    seek = commands.add_parser("seek", help="seek the current track")
+    seek.add_argument(
+        "position",
+        type=parse_seek,
+        help="+10 / -10 (relative), 90 or 1:30 (absolute), 50%%",
+    )
+    status = commands.add_parser("status", help="show what is playing")
+    status.add_argument("--json", action="store_true", help="full state as JSON")
+    commands.add_parser("quit", help="stop the daemon")
+    imports = commands.add_parser(
+        "import-lyrics", help="import .lrc/.txt lyric files for offline use"
+    )
+    imports.add_argument("dirs", nargs="+", help="directories to scan")
+    imports.add_argument("--jobs", type=int, default=None, help="parser processes")
+    scan = commands.add_parser(
+        "scan-library", help="index local music (default: --library dirs)"
+    )
+    scan.add_argument("dirs", nargs="*", help="directories to scan")
+    scan.add_argument("--jobs", type=int, default=8, help="scanner threads")
+    parser.add_argument(
+        "--attach",
+        action="store_true",
+        help="start the daemon if needed and attach the TUI to it",
+    )
+    return parser
+
+
+def run_headless(args: argparse.Namespace):
+    """Drive the full run() loop on a MemoryScreen and report timings"""
+    cols, rows = (int(v) for v in args.size.lower().split("x"))
+    screen = MemoryScreen(rows, cols, MemoryScreen.parse_keys(args.keys))
+    tui = YouTubeTUI(screen, args)
+    started = time.perf_counter()
+    tui.run(max_frames=args.frames, interactive=False)
+    elapsed = time.perf_counter() - started
+
+    frames = sorted(tui.tracer.samples.get("frame", []))
+    count = max(1, len(frames))
+    report = {
+        "frames": len(frames),
+        "wall_s": round(elapsed, 3),
+        "frame_ms": {
+            "p50": round(frames[len(frames) // 2] * 1000, 3) if frames else None,
+            "p95": round(
+                frames[min(len(frames) - 1, int(len(frames) * 0.95))] * 1000, 3
+            )
+            if frames
+            else None,
+            "max": round(frames[-1] * 1000, 3) if frames else None,
+        },
+        "addstr_calls_per_frame": round(screen.addstr_calls / count, 1),
+        "addstr_bytes_per_frame": round(screen.addstr_bytes / count, 1),
+        "emitted_bytes_per_frame": round(screen.emitted_bytes / count, 1),
+    }
+    print(json.dumps(report, indent=2))
 
 
 def main():
+    args = build_arg_parser().parse_args()
+    if not args.profile:
+        launch(args)
+        return
+
+    profiler = SamplingProfiler(args.profile_rate)
+    profiler.start()
+    try:
+        launch(args)
+    finally:
+        profiler.stop()
+        paths = profiler.write(args.profile)
+        print(
+            f"profile: {profiler.samples} samples -> {', '.join(paths)}",
+            file=sys.stderr,
+        )
+
+
+def launch(args: argparse.Namespace):
+    """Dispatch to headless, batch, daemon, CLI command or the TUI"""
+    if args.headless:
+        run_headless(args)
+        return
+    if args.batch:
+        sys.exit(run_batch(args))
+    if args.command == "daemon":
+        PlayerDaemon(args).serve_forever()
+        return
+    if args.command is not None:
+        sys.exit(run_command(args))
+
+    client = start_daemon(args) if args.attach else DaemonClient()
+    if args.attach or client.alive():
+
+        def attached(stdscr):
+            tui = YouTubeTUI(stdscr, args)
+            tui.attach(client)
+            tui.run()
+
+        curses.wrapper(attached)
+        return
+
     missing = []
 
     try:
@@ -1125,7 +4824,7 @@ def main():
     print("\nStarting YAAP...")
     time.sleep(1)
 
-    curses.wrapper(lambda stdscr: YouTubeTUI(stdscr).run())
+    curses.wrapper(lambda stdscr: YouTubeTUI(stdscr, args).run())
 
 
 if __name__ == "__main__":